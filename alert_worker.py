@@ -0,0 +1,164 @@
+# alert_worker.py
+# Price polling and alert evaluation outside the bot process. Symbols are split across
+# ALERT_WORKERS processes by a stable hash; each one keeps its own alert index, scheduler
+# and price source, and writes fired alerts to the alert_outbox table for the bot to DM.
+# Run the bot with ALERT_WORKER=1 so it drains the outbox instead of evaluating alerts itself.
+import asyncio
+import multiprocessing
+import os
+import time
+import zlib
+from dotenv import load_dotenv
+from utils import price_feed, alert_outbox
+from utils.db import Database
+from utils.migrations import MIGRATIONS
+from utils.alert_index import AlertIndex, alert_line
+from utils.alert_scheduler import AlertScheduler
+from utils.metrics import alert_cycle_seconds, alerts_fired
+
+load_dotenv()
+ALERT_WORKERS = int(os.getenv("ALERT_WORKERS", str(os.cpu_count() or 1)))
+
+POLL_INTERVAL = 60.0
+# Full reload of this partition's alerts; picks up deletions and re-arms undelivered alerts.
+# New alerts are picked up every cycle by id.
+RESYNC_EVERY = 10 * 60.0
+
+def partition_of(symbol, partitions):
+    # crc32 rather than hash(): it has to agree across processes
+    return zlib.crc32(symbol.encode()) % partitions
+
+class AlertPartition:
+    def __init__(self, db, partition, partitions):
+        self.db = db
+        self.partition = partition
+        self.partitions = partitions
+        self.index = AlertIndex()
+        self.scheduler = AlertScheduler()
+        self.feed = price_feed.from_env()
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._writes = set()
+
+    def owns(self, symbol):
+        return partition_of(symbol, self.partitions) == self.partition
+
+    async def resync(self):
+        # Fired alerts still on their way to the outbox would otherwise be armed again
+        await asyncio.gather(*self._writes, return_exceptions=True)
+        rows = await self.db.fetchall("SELECT id, user_id, symbol, condition, target FROM alerts")
+        pending = await alert_outbox.pending_alert_ids(self.db)
+        old_symbols = set(self.index.symbols())
+        self.index = AlertIndex.from_rows(
+            row for row in rows if self.owns(row[2]) and row[0] not in pending
+        )
+        self._last_id = max((row[0] for row in rows), default=self._last_id)
+        self._synced_at = time.monotonic()
+
+        symbols = set(self.index.symbols())
+        self.feed.watch(symbols)
+        self.feed.unwatch(old_symbols - symbols)
+
+    async def pick_up_new(self):
+        rows = await self.db.fetchall(
+            "SELECT id, user_id, symbol, condition, target FROM alerts WHERE id > ?", (self._last_id,)
+        )
+        for alert_id, user_id, symbol, condition, target in rows:
+            self._last_id = max(self._last_id, alert_id)
+            if self.owns(symbol):
+                self.index.add(alert_id, user_id, symbol, condition, target)
+                self.scheduler.forget(symbol)  # re-check soon against the new threshold
+                self.feed.watch([symbol])
+
+    def fire(self, prices):
+        entries = [
+            (alert_id, user_id, alert_line(symbol, price, condition, target))
+            for alert_id, (user_id, symbol, condition, target), price in self.index.pop_triggered(prices)
+        ]
+        if entries:
+            alerts_fired.inc(len(entries))
+            task = asyncio.create_task(alert_outbox.write(self.db, entries))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+        return len(entries)
+
+    async def cycle(self):
+        if time.monotonic() - self._synced_at > RESYNC_EVERY:
+            await self.resync()
+        else:
+            await self.pick_up_new()
+
+        symbols = self.scheduler.due(self.feed.stale(self.index.symbols()))
+        if not symbols:
+            return
+        with alert_cycle_seconds.time():
+            prices = await self.feed.fetch(symbols)
+            self.fire(prices)
+            for symbol in symbols:
+                self.scheduler.reschedule(symbol, prices.get(symbol), self.index)
+
+    async def run(self):
+        await self.resync()
+        await self.feed.start(self.fire)
+        print(f"🔔 Alert worker {self.partition + 1}/{self.partitions} watching {len(self.index)} alerts")
+        while True:
+            started = time.monotonic()
+            try:
+                await self.cycle()
+            except Exception as e:
+                print(f"Alert worker {self.partition + 1}/{self.partitions} cycle failed: {e}")
+            await asyncio.sleep(max(0.0, POLL_INTERVAL - (time.monotonic() - started)))
+
+async def wait_for_schema(db):
+    # The bot owns migrations; don't touch the tables until it has applied them
+    while True:
+        row = await db.fetchone("PRAGMA user_version")
+        if row and row[0] >= len(MIGRATIONS):
+            return
+        await asyncio.sleep(2.0)
+
+async def run_partition(partition, partitions):
+    db = Database(readers=1)
+    await db.connect()
+    try:
+        await wait_for_schema(db)
+        await AlertPartition(db, partition, partitions).run()
+    finally:
+        await db.close()
+
+def _partition_main(partition, partitions):
+    try:
+        asyncio.run(run_partition(partition, partitions))
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    partitions = max(1, ALERT_WORKERS)
+    context = multiprocessing.get_context("spawn")
+
+    def spawn(partition):
+        process = context.Process(
+            target=_partition_main, args=(partition, partitions), name=f"alert-worker-{partition}"
+        )
+        process.start()
+        return process
+
+    processes = [spawn(i) for i in range(partitions)]
+    print(f"🔔 Started {partitions} alert worker processes")
+    try:
+        while True:
+            time.sleep(5.0)
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"Alert worker {i + 1}/{partitions} exited ({process.exitcode}); restarting")
+                    processes[i] = spawn(i)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import math
+import sys
+import time
+import types
+import zlib
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from utils.history import period_start
+
+WALK_DAYS = 3000  # longest history the fake can serve (~8 years of weekdays)
+
+# Deterministic stand-in for the parts of yfinance the bot uses. Every symbol in the
+# universe gets a seeded random walk, so runs are repeatable and never touch the network.
+# latency/bulk_latency sleep inside the call (on the market executor), like a real request.
+class FakeYFinance:
+    def __init__(self, universe, latency=0.0, bulk_latency=0.0):
+        self.universe = set(universe)
+        self.latency = latency
+        self.bulk_latency = bulk_latency
+        self.tick = 0
+        self.calls = 0
+        self._walks = {}
+        self.utils = types.SimpleNamespace(get_ticker_by_isin=lambda isin: None)
+
+    def install(self):
+        module = types.ModuleType("yfinance")
+        module.Ticker = lambda symbol: _FakeTicker(self, symbol)
+        module.download = self.download
+        module.utils = self.utils
+        sys.modules["yfinance"] = module
+        return module
+
+    def bump(self):
+        # Moves the latest prices, so successive alert cycles see new quotes
+        self.tick += 1
+
+    def _walk(self, symbol):
+        walk = self._walks.get(symbol)
+        if walk is None:
+            seed = zlib.crc32(symbol.encode())
+            rng = np.random.default_rng(seed)
+            base = 20 + seed % 480
+            walk = base * np.exp(np.cumsum(rng.normal(0, 0.015, WALK_DAYS)))
+            self._walks[symbol] = walk
+        return walk
+
+    def last_price(self, symbol):
+        seed = zlib.crc32(symbol.encode())
+        return float(self._walk(symbol)[-1] * (1 + 0.05 * math.sin(self.tick + seed)))
+
+    def frame(self, symbol, start):
+        if symbol not in self.universe:
+            return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+        today = date.today()
+        days = (today - start).days
+        rows = min(WALK_DAYS, max(1, days if days <= 5 else days * 5 // 7))
+        index = pd.bdate_range(end=today, periods=rows)
+        closes = self._walk(symbol)[-rows:].copy()
+        closes[-1] = self.last_price(symbol)
+        return pd.DataFrame(
+            {
+                "Open": closes * 0.995,
+                "High": closes * 1.01,
+                "Low": closes * 0.99,
+                "Close": closes,
+                "Volume": np.full(rows, 1_000_000),
+            },
+            index=index,
+        )
+
+    def history(self, symbol, period="1mo", interval="1d"):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.frame(symbol, _start_for(period))
+
+    def download(self, tickers, period=None, interval="1d", start=None, **kwargs):
+        self.calls += 1
+        if self.bulk_latency:
+            time.sleep(self.bulk_latency)
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+        begin = date.fromisoformat(start) if start else _start_for(period)
+        frames = {symbol: self.frame(symbol, begin) for symbol in tickers if symbol in self.universe}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+def _start_for(period):
+    return period_start(period or "1mo") or date.today() - timedelta(days=5 * 365)
+
+class _FakeTicker:
+    def __init__(self, fake, symbol):
+        self.fake = fake
+        self.symbol = symbol
+
+    def history(self, period="1mo", interval="1d", **kwargs):
+        return self.fake.history(self.symbol, period, interval)
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.bot = False
+        self.dms = 0
+
+    async def send(self, content=None, **kwargs):
+        self.dms += 1
+
+class FakeResponse:
+    def __init__(self):
+        self.deferred = False
+        self.messages = []
+
+    def is_done(self):
+        return self.deferred or bool(self.messages)
+
+    async def defer(self, **kwargs):
+        self.deferred = True
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append(content)
+
+class FakeFollowup:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        self.messages.append(content)
+
+# Only what the cogs touch: user, response/followup, extras and client
+class FakeInteraction:
+    def __init__(self, client, user):
+        self.client = client
+        self.user = user
+        self.guild = None
+        self.guild_id = None
+        self.command = None
+        self.extras = {}
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
@@ -0,0 +1,78 @@
+# Local stand-in for a push price feed, speaking the protocol StreamingPriceSource expects.
+# Subscribed symbols get a tick from the fake random walk every --interval seconds:
+#
+#   python -m bench.feed --port 8765
+#   PRICE_FEED=stream PRICE_FEED_ADDR=127.0.0.1:8765 python main.py
+import argparse
+import asyncio
+import json
+import random
+
+class FeedServer:
+    def __init__(self, fake, interval=1.0):
+        self.fake = fake
+        self.interval = interval
+        self._clients = {}  # writer -> subscribed symbols
+        self._server = None
+        self._ticker = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._serve, host, port)
+        if self.interval:
+            self._ticker = asyncio.create_task(self._tick_loop())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._ticker:
+            self._ticker.cancel()
+        for writer in list(self._clients):
+            writer.close()
+        self._server.close()
+
+    def push(self, symbol, price):
+        line = json.dumps({"symbol": symbol, "price": price}).encode() + b"\n"
+        for writer, symbols in self._clients.items():
+            if symbol in symbols:
+                writer.write(line)
+
+    async def _serve(self, reader, writer):
+        symbols = self._clients[writer] = set()
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                symbols.update(message.get("subscribe", ()))
+                symbols.difference_update(message.get("unsubscribe", ()))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    async def _tick_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.fake.bump()
+            for symbols in list(self._clients.values()):
+                for symbol in list(symbols):
+                    # A little noise on top of the walk so consecutive ticks differ
+                    price = self.fake.last_price(symbol) * (1 + random.uniform(-0.002, 0.002))
+                    self.push(symbol, round(price, 4))
+
+async def serve_forever(args):
+    from bench.fakes import FakeYFinance
+    from bench.run import load_universe
+    server = FeedServer(FakeYFinance(load_universe(args.symbols)), interval=args.interval)
+    port = await server.start(args.host, args.port)
+    print(f"📡 Fake price feed on {args.host}:{port}")
+    await asyncio.Event().wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake streaming price feed")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between tick rounds")
+    parser.add_argument("--symbols", type=int, default=250)
+    asyncio.run(serve_forever(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# Offline benchmarks for the hot paths: runs the real cog code against a seeded temporary
+# database, a deterministic fake of yfinance and fake Discord interactions.
+#
+#   python -m bench.run                                  # defaults: 10k users, 100k alerts
+#   python -m bench.run --users 1000 --alerts 5000 --only list,alert_cycle
+#   python -m bench.run --save bench/baseline.json       # record a baseline
+#   python -m bench.run --baseline bench/baseline.json   # exit 1 if a p99 regressed
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+SCENARIOS = ("interaction", "list", "list_chart", "compare", "alert_cycle", "stream")
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+async def measure(name, op, count, concurrency):
+    latencies = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with slots:
+            started = time.perf_counter()
+            await op(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    wall = time.perf_counter() - started
+    return {
+        "name": name,
+        "ops": count,
+        "ops_per_s": count / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+def load_universe(limit):
+    with open(os.path.join("assets", "symbols.csv"), newline="", encoding="utf-8") as f:
+        symbols = [row["symbol"] for row in csv.DictReader(f)]
+    return symbols[:limit]
+
+async def seed(db, fake, universe, args, rng):
+    user_ids = [10**17 + i for i in range(args.users)]
+
+    seen = [(str(u),) for u in user_ids if rng.random() < args.seen_ratio]
+    watchlists = [
+        (str(u), symbol)
+        for u in user_ids
+        for symbol in rng.sample(universe, rng.randint(1, args.watchlist_size))
+    ]
+    settings = [
+        (str(u), "USD", rng.choice((7, 30, 90, 365)), rng.randint(0, 1), args.watchlist_size)
+        for u in user_ids if rng.random() < 0.3
+    ]
+    alerts = []
+    for _ in range(args.alerts):
+        symbol = rng.choice(universe)
+        price = fake.last_price(symbol)
+        condition = rng.choice(("above", "below"))
+        # Mostly out of reach, a few close enough to fire as the fake prices move
+        offset = rng.uniform(0.01, 0.30)
+        target = price * (1 + offset) if condition == "above" else price * (1 - offset)
+        alerts.append((str(rng.choice(user_ids)), symbol, condition, round(target, 2)))
+
+    await db.executemany("INSERT OR IGNORE INTO seen_users (user_id) VALUES (?)", seen)
+    await db.executemany("INSERT OR IGNORE INTO watchlists (user_id, symbol) VALUES (?, ?)", watchlists)
+    await db.executemany(
+        "INSERT INTO user_settings (user_id, currency, chart_days, show_percentages, watchlist_limit) "
+        "VALUES (?, ?, ?, ?, ?)", settings
+    )
+    await db.executemany(
+        "INSERT INTO alerts (user_id, symbol, condition, target) VALUES (?, ?, ?, ?)", alerts
+    )
+    return user_ids
+
+async def run(args):
+    # Imported late: DB_PATH and CHART_CACHE_DIR are read at import time
+    from bench.fakes import FakeYFinance, FakeUser, FakeInteraction
+    from bench.feed import FeedServer
+    from utils import market, charts, alert_scheduler, price_feed
+    from utils.migrations import migrate
+    from utils.notifier import NotificationDispatcher
+    from main import FinancePal
+    from cogs.watchlist import Watchlist
+    from cogs.compare import Compare
+    from cogs.alerts import Alerts
+
+    rng = random.Random(args.seed)
+    universe = load_universe(args.symbols)
+    fake = FakeYFinance(universe, latency=args.latency / 1000, bulk_latency=args.bulk_latency / 1000)
+    fake.install()
+    # The bench runs at any hour; every market counts as open
+    alert_scheduler.is_market_open = lambda symbol, now=None: True
+
+    bot = FinancePal()
+    users = {}
+    bot.get_user = lambda user_id: users.setdefault(user_id, FakeUser(user_id))
+
+    charts.start()
+    await bot.db.connect()
+    await migrate(bot.db)
+
+    started = time.perf_counter()
+    user_ids = await seed(bot.db, fake, universe, args, rng)
+    print(f"Seeded {args.users} users, {args.alerts} alerts in {time.perf_counter() - started:.1f}s")
+    await bot.seen_users.load()
+    bot.seen_users.start()
+    started = time.perf_counter()
+    quotes = await bot.snapshot.refresh()
+    print(f"Price snapshot: {quotes} symbols in {time.perf_counter() - started:.2f}s")
+
+    watchlist = Watchlist(bot)
+    compare = Compare(bot)
+    alerts = Alerts(bot)
+    alerts.check_alerts.cancel()  # driven by hand below
+    await alerts.cog_load()
+    # Fake DMs cost nothing, so don't let the real rate limit dominate the numbers
+    alerts.dispatcher = NotificationDispatcher(bot, concurrency=50, per_second=1e9)
+
+    def interaction_for(i):
+        user_id = rng.choice(user_ids)
+        return FakeInteraction(bot, bot.get_user(user_id))
+
+    async def interaction(i):
+        # Half the time a brand-new user, who gets the welcome DM
+        user_id = rng.choice(user_ids) if i % 2 else 10**18 + i
+        await bot.on_interaction(FakeInteraction(bot, FakeUser(user_id)))
+
+    async def list_prices(i):
+        await Watchlist.list.callback(watchlist, interaction_for(i))
+
+    async def list_chart(i):
+        await Watchlist.list.callback(watchlist, interaction_for(i), chart=True)
+
+    async def compare_chart(i):
+        symbols = rng.sample(universe, rng.randint(2, 5)) + [None] * 3
+        await Compare.compare.callback(compare, interaction_for(i), *symbols[:5])
+
+    fired = []
+
+    async def alert_cycle(i):
+        # Every symbol due and no warm quotes: the worst case a real tick can hit
+        fake.bump()
+        market.quote_cache.clear()
+        alerts.scheduler = alert_scheduler.AlertScheduler()
+        before = len(alerts.index)
+        await alerts.check_alerts()
+        fired.append(before - len(alerts.index))
+
+    server = FeedServer(fake, interval=0)
+    ticked = asyncio.Event()
+
+    def on_tick(prices):
+        alerts.fire_alerts(prices)
+        ticked.set()
+
+    async def stream_tick(i):
+        # Time from the feed writing a crossing tick to the alerts having fired
+        if alerts.feed.name != "stream":
+            port = await server.start()
+            alerts.feed = price_feed.StreamingPriceSource("127.0.0.1", port)
+            alerts.feed.watch(alerts.index.symbols())
+            await alerts.feed.start(on_tick)
+            while not server._clients or not next(iter(server._clients.values())):
+                await asyncio.sleep(0.01)
+        symbol = rng.choice(sorted(alerts.index.symbols()))
+        ticked.clear()
+        before = len(alerts.index)
+        server.push(symbol, fake.last_price(symbol) * rng.choice((0.5, 2.0)))
+        await ticked.wait()
+        fired.append(before - len(alerts.index))
+
+    plan = {
+        "interaction": (interaction, args.ops, args.concurrency),
+        "list": (list_prices, args.ops, args.concurrency),
+        "list_chart": (list_chart, max(1, args.ops // 10), args.concurrency),
+        "compare": (compare_chart, max(1, args.ops // 10), args.concurrency),
+        "alert_cycle": (alert_cycle, args.cycles, 1),
+        "stream": (stream_tick, max(1, args.ops // 10), 1),
+    }
+    results = []
+    try:
+        for name in args.only:
+            op, count, concurrency = plan[name]
+            result = await measure(name, op, count, concurrency)
+            if name in ("alert_cycle", "stream"):
+                result["alerts_fired"] = sum(fired)
+                fired.clear()
+            results.append(result)
+            print(format_result(result))
+    finally:
+        await asyncio.gather(*alerts._deliveries, return_exceptions=True)
+        await alerts.dispatcher.close()
+        await alerts.feed.close()
+        if server._server:
+            await server.close()
+        await bot.seen_users.close()
+        await bot.db.close()
+        market.shutdown()
+        charts.shutdown()
+
+    print(f"yfinance calls: {fake.calls}")
+    return results
+
+def format_result(result):
+    line = (
+        f"{result['name']:<12} {result['ops']:>6} ops  {result['ops_per_s']:>9.1f} ops/s  "
+        f"p50 {result['p50_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  max {result['max_ms']:>8.2f}ms"
+    )
+    if "alerts_fired" in result:
+        line += f"  fired {result['alerts_fired']}"
+    return line
+
+def compare_to_baseline(results, path, tolerance):
+    with open(path, encoding="utf-8") as f:
+        baseline = {r["name"]: r for r in json.load(f)}
+    regressed = False
+    for result in results:
+        old = baseline.get(result["name"])
+        if not old or not old["p99_ms"]:
+            continue
+        change = result["p99_ms"] / old["p99_ms"] - 1
+        flag = "REGRESSION" if change > tolerance else "ok"
+        regressed |= change > tolerance
+        print(f"{result['name']:<12} p99 {old['p99_ms']:.2f}ms -> {result['p99_ms']:.2f}ms ({change:+.0%}) {flag}")
+    return regressed
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="FinancePal offline benchmarks")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--alerts", type=int, default=100_000)
+    parser.add_argument("--symbols", type=int, default=250, help="size of the ticker universe")
+    parser.add_argument("--watchlist-size", type=int, default=10, help="max symbols per watchlist")
+    parser.add_argument("--seen-ratio", type=float, default=0.9, help="share of users already welcomed")
+    parser.add_argument("--ops", type=int, default=2000, help="operations per command scenario")
+    parser.add_argument("--cycles", type=int, default=5, help="alert cycles to run")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=20.0, help="fake per-symbol fetch latency (ms)")
+    parser.add_argument("--bulk-latency", type=float, default=200.0, help="fake bulk download latency (ms)")
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="comma-separated scenarios")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare p99s against a saved run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p99 slowdown vs baseline")
+    args = parser.parse_args(argv)
+    args.only = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(args.only) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="financepal-bench-") as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ["CHART_CACHE_DIR"] = os.path.join(tmp, "charts")
+        results = asyncio.run(run(args))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline and compare_to_baseline(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,137 @@
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
-import aiosqlite
+import asyncio
 import os
-import yfinance as yf
-
-DB_PATH = "data/finance.db"
-os.makedirs("data", exist_ok=True)
-
-async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute('''CREATE TABLE IF NOT EXISTS alerts (
-            user_id TEXT,
-            symbol TEXT,
-            condition TEXT,
-            target REAL
-        )''')
-        await db.commit()
-
-
-# 🧠 Shared ticker list for autocomplete
-COMMON_TICKERS = [
-    "AAPL", "MSFT", "TSLA", "GOOGL", "AMZN", "NVDA", "META",
-    "VOO", "SPY", "QQQ", "QDV5.DE", "IE00BKM4GZ66"
-]
-
-async def autocomplete_ticker(interaction: discord.Interaction, current: str):
-    current = current.upper()
-    return [
-        app_commands.Choice(name=ticker, value=ticker)
-        for ticker in COMMON_TICKERS if current in ticker
-    ][:10]
+import time
+from collections import defaultdict
+from utils.tickers import autocomplete_ticker
+from utils import price_feed, alert_outbox
+from utils.alert_index import AlertIndex, alert_line
+from utils.notifier import NotificationDispatcher
+from utils.alert_scheduler import AlertScheduler
+from utils.metrics import alert_cycle_seconds, alerts_fired, alert_delivery_seconds
+
+# Set when alert_worker.py evaluates alerts; the bot then only sends what lands in the outbox
+ALERT_WORKER = os.getenv("ALERT_WORKER", "").lower() in ("1", "true", "yes")
+# An alert whose DM failed sits out this long (doubling per failure) before it can fire again
+RETRY_MIN = 5 * 60.0
+RETRY_MAX = 6 * 60 * 60.0
+# With shards split across processes, the others add and remove alerts behind this index's
+# back: new ids are picked up every tick, and a full reload this often catches removals
+RESYNC_EVERY = 10 * 60.0
 
 class Alerts(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        bot.loop.create_task(init_db())
-        self.check_alerts.start()
+        self.db = bot.db
+        self.index = AlertIndex()
+        self.dispatcher = NotificationDispatcher(bot)
+        self.scheduler = AlertScheduler()
+        self.feed = price_feed.from_env()
+        self._deliveries = set()
+        self._parked = {}  # alert id -> (alert, retry at) for alerts whose delivery failed
+        self._failures = {}  # alert id -> failed deliveries in a row
+        self._sent = set()  # parked alert ids that were DMed but couldn't be deleted yet
+        self._in_flight = set()  # fired alert ids whose DM hasn't been settled yet
+        self._last_id = 0
+        self._synced_at = 0.0
+        # Sharded across processes, only the one holding shard 0 evaluates alerts
+        self.evaluates = not ALERT_WORKER and bot.is_primary
+        if ALERT_WORKER:
+            self.drain_outbox.start()
+        elif self.evaluates:
+            self.check_alerts.start()
+
+    async def cog_load(self):
+        # Only the evaluating process holds alerts in memory (ALERT_WORKER mode leaves that to
+        # the workers). The only full read of the alerts table; commands keep the index current.
+        if not self.evaluates:
+            return
+        rows = await self.get_all_alerts()
+        self.index = AlertIndex.from_rows(rows)
+        self._last_id = max((row[0] for row in rows), default=0)
+        self._synced_at = time.monotonic()
+        self.feed.watch(self.index.symbols())
+        await self.feed.start(self.fire_alerts)
+
+    async def cog_unload(self):
+        self.check_alerts.cancel()
+        self.drain_outbox.cancel()
+        await self.feed.close()
+        await self.dispatcher.close()
+
+    def refresh_watch(self, symbols):
+        # Keep the price feed subscribed to exactly the symbols that still have alerts
+        symbols = set(symbols)
+        self.feed.watch([s for s in symbols if self.index.has_symbol(s)])
+        self.feed.unwatch([s for s in symbols if not self.index.has_symbol(s)])
 
     async def add_alert(self, user_id, symbol, condition, target):
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute("INSERT INTO alerts VALUES (?, ?, ?, ?)", (user_id, symbol, condition, target))
-            await db.commit()
+        alert_id = await self.db.insert(
+            "INSERT INTO alerts (user_id, symbol, condition, target) VALUES (?, ?, ?, ?)",
+            (user_id, symbol, condition, target)
+        )
+        if self.evaluates:
+            self.index.add(alert_id, user_id, symbol, condition, target)
+            self.scheduler.forget(symbol)  # re-check soon against the new threshold
+            self.feed.watch([symbol])
+        return alert_id
+
+    def _unarmed(self):
+        # Out of the index on purpose: being delivered, or waiting out a failed delivery
+        return self._in_flight | self._parked.keys()
+
+    async def pick_up_new(self):
+        rows = await self.db.fetchall(
+            "SELECT id, user_id, symbol, condition, target FROM alerts WHERE id > ?", (self._last_id,)
+        )
+        unarmed = self._unarmed()
+        for alert_id, user_id, symbol, condition, target in rows:
+            self._last_id = max(self._last_id, alert_id)
+            if alert_id not in unarmed and alert_id not in self.index:
+                self.index.add(alert_id, user_id, symbol, condition, target)
+                self.scheduler.forget(symbol)
+                self.feed.watch([symbol])
+
+    async def resync(self):
+        rows = await self.get_all_alerts()
+        unarmed = self._unarmed()
+        old_symbols = set(self.index.symbols())
+        self.index = AlertIndex.from_rows(row for row in rows if row[0] not in unarmed)
+        self._last_id = max((row[0] for row in rows), default=self._last_id)
+        self._synced_at = time.monotonic()
+
+        symbols = set(self.index.symbols())
+        self.feed.watch(symbols)
+        self.feed.unwatch(old_symbols - symbols)
 
     async def get_user_alerts(self, user_id):
-        async with aiosqlite.connect(DB_PATH) as db:
-            cursor = await db.execute("SELECT symbol, condition, target FROM alerts WHERE user_id = ?", (user_id,))
-            return await cursor.fetchall()
+        return await self.db.fetchall("SELECT symbol, condition, target FROM alerts WHERE user_id = ?", (user_id,))
 
     async def remove_alert(self, user_id, symbol, target):
-        async with aiosqlite.connect(DB_PATH) as db:
-            cursor = await db.execute(
-                "DELETE FROM alerts WHERE user_id = ? AND symbol = ? AND target = ?",
-                (user_id, symbol, target)
-            )
-            await db.commit()
-            return cursor.rowcount > 0
+        removed = await self.db.execute(
+            "DELETE FROM alerts WHERE user_id = ? AND symbol = ? AND target = ?",
+            (user_id, symbol, target)
+        )
+        for alert_id in self.index.find(user_id, symbol, target):
+            self.index.remove(alert_id)
+        self.refresh_watch([symbol])
+        return removed > 0
 
     async def clear_alerts(self, user_id):
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute("DELETE FROM alerts WHERE user_id = ?", (user_id,))
-            await db.commit()
+        await self.db.execute("DELETE FROM alerts WHERE user_id = ?", (user_id,))
+        symbols = [self.index.get(alert_id)[1] for alert_id in self.index.user_alert_ids(user_id)]
+        self.index.remove_user(user_id)
+        self.refresh_watch(symbols)
 
     async def get_all_alerts(self):
-        async with aiosqlite.connect(DB_PATH) as db:
-            cursor = await db.execute("SELECT user_id, symbol, condition, target FROM alerts")
-            return await cursor.fetchall()
+        return await self.db.fetchall("SELECT id, user_id, symbol, condition, target FROM alerts")
 
-    async def delete_alert_entry(self, user_id, symbol, target):
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute("DELETE FROM alerts WHERE user_id = ? AND symbol = ? AND target = ?", (user_id, symbol, target))
-            await db.commit()
+    async def delete_alerts(self, alert_ids):
+        await self.db.executemany("DELETE FROM alerts WHERE id = ?", [(alert_id,) for alert_id in alert_ids])
+        for alert_id in alert_ids:
+            self.index.remove(alert_id)
 
     @app_commands.command(name="alert", description="Set a price alert for a stock or ETF.")
     @app_commands.describe(
@@ -87,18 +148,14 @@ class Alerts(commands.Cog):
             await interaction.followup.send("❌ Condition must be `above` or `below`.", ephemeral=True)
             return
 
-        try:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period="1d")
-            if data.empty:
-                raise ValueError("No data found")
-        except Exception:
+        valid_symbol = await self.bot.validator.validate(symbol)
+        if not valid_symbol:
             await interaction.followup.send(f"❌ Could not validate `{symbol}`.", ephemeral=True)
             return
 
-        await self.add_alert(str(interaction.user.id), symbol.upper(), condition, target)
+        await self.add_alert(str(interaction.user.id), valid_symbol, condition, target)
         await interaction.followup.send(
-            f"✅ Alert set: `{symbol.upper()}` {'>' if condition == 'above' else '<'} {target}",
+            f"✅ Alert set: `{valid_symbol}` {'>' if condition == 'above' else '<'} {target}",
             ephemeral=True
         )
 
@@ -141,35 +198,194 @@ class Alerts(commands.Cog):
         await self.clear_alerts(user_id)
         await interaction.followup.send("🧹 All your alerts have been cleared.", ephemeral=True)
 
-    @tasks.loop(minutes=5.0)
-    async def check_alerts(self):
-        all_alerts = await self.get_all_alerts()
-        to_remove = []
+    def fire_alerts(self, prices):
+        # Everything one user triggered goes out as a single DM
+        fired = defaultdict(list)
+        for alert_id, alert, current in self.index.pop_triggered(prices):
+            user_id, symbol, condition, target = alert
+            fired[user_id].append((alert_id, alert, alert_line(symbol, current, condition, target)))
+
+        if fired:
+            alerts_fired.inc(sum(len(entries) for entries in fired.values()))
+            self._in_flight.update(alert_id for entries in fired.values() for alert_id, _, _ in entries)
+            task = asyncio.create_task(self.deliver_alerts(fired))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+        return sum(len(entries) for entries in fired.values())
+
+    async def deliver_alerts(self, fired):
+        try:
+            await self._deliver_alerts(fired)
+        finally:
+            self._in_flight.difference_update(
+                alert_id for entries in fired.values() for alert_id, _, _ in entries
+            )
+
+    def park(self, alerts):
+        # alerts: (alert_id, alert). Out of the index until their retry time; re-armed right
+        # away, a streaming feed would fire them again on the next tick
+        alerts = list(alerts)
+        now = time.monotonic()
+        for alert_id, alert in alerts:
+            failures = self._failures.get(alert_id, 0) + 1
+            self._failures[alert_id] = failures
+            self._parked[alert_id] = (alert, now + min(RETRY_MIN * 2 ** (failures - 1), RETRY_MAX))
+        self.refresh_watch(alert[1] for _, alert in alerts)
+
+    async def _deliver_alerts(self, fired):
+        # Alerts removed since they fired (possibly by another process) are dropped rather than sent
+        try:
+            active = await self.active_alert_ids(
+                [alert_id for entries in fired.values() for alert_id, _, _ in entries]
+            )
+        except Exception as e:
+            print(f"Alert delivery failed: {e}")
+            self.park((alert_id, alert) for entries in fired.values() for alert_id, alert, _ in entries)
+            return
+        dropped = [entry for entries in fired.values() for entry in entries if entry[0] not in active]
+        for alert_id, _, _ in dropped:
+            self._failures.pop(alert_id, None)
+        self.refresh_watch(alert[1] for _, alert, _ in dropped)
+
+        by_user = {}
+        for user_id, entries in fired.items():
+            entries = [entry for entry in entries if entry[0] in active]
+            if entries:
+                by_user[user_id] = entries
+        futures = {
+            user_id: self.dispatcher.submit(user_id, [line for _, _, line in entries])
+            for user_id, entries in by_user.items()
+        }
+        delivered, undelivered = [], []
+        for user_id, future in futures.items():
+            (delivered if await future else undelivered).extend(by_user[user_id])
 
-        for user_id, symbol, condition, target in all_alerts:
+        if delivered:
             try:
-                ticker = yf.Ticker(symbol)
-                data = ticker.history(period="1d")
-                if data.empty:
-                    continue
-                current = data["Close"].iloc[-1]
-
-                if (condition == "above" and current > target) or (condition == "below" and current < target):
-                    user = await self.bot.fetch_user(int(user_id))
-                    arrow = "📈" if condition == "above" else "📉"
-                    await user.send(
-                        f"{arrow} Alert: `{symbol}` is now at ${current:.2f} ({condition} {target})"
-                    )
-                    to_remove.append((user_id, symbol, target))
-            except Exception:
-                continue
-
-        for user_id, symbol, target in to_remove:
-            await self.delete_alert_entry(user_id, symbol, target)
+                await self.delete_alerts([alert_id for alert_id, _, _ in delivered])
+            except Exception as e:
+                # Already DMed: parked so the delete is retried, never so they fire again
+                print(f"Deleting delivered alerts failed: {e}")
+                self._sent.update(alert_id for alert_id, _, _ in delivered)
+                self.park((alert_id, alert) for alert_id, alert, _ in delivered)
+            else:
+                for alert_id, _, _ in delivered:
+                    self._failures.pop(alert_id, None)
+                self.refresh_watch(alert[1] for _, alert, _ in delivered)
+
+        # Like before, alerts we couldn't DM stay active, but sit out a while first
+        self.park((alert_id, alert) for alert_id, alert, _ in undelivered)
+
+    async def active_alert_ids(self, alert_ids):
+        active = set()
+        for i in range(0, len(alert_ids), 500):
+            chunk = alert_ids[i:i + 500]
+            rows = await self.db.fetchall(
+                f"SELECT id FROM alerts WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            active.update(row[0] for row in rows)
+        return active
+
+    async def rearm_parked(self):
+        # Parked alerts come back once their retry time passes, unless the user removed them meanwhile
+        now = time.monotonic()
+        due = [alert_id for alert_id, (_, retry_at) in self._parked.items() if retry_at <= now]
+        if not due:
+            return
+
+        sent = [alert_id for alert_id in due if alert_id in self._sent]
+        if sent:
+            try:
+                await self.delete_alerts(sent)
+            except Exception as e:
+                print(f"Deleting delivered alerts failed: {e}")
+                self.park((alert_id, self._parked[alert_id][0]) for alert_id in sent)
+            else:
+                for alert_id in sent:
+                    self._parked.pop(alert_id)
+                    self._failures.pop(alert_id, None)
+                    self._sent.discard(alert_id)
+            due = [alert_id for alert_id in due if alert_id not in sent]
+            if not due:
+                return
+
+        active = await self.active_alert_ids(due)
+        for alert_id in due:
+            alert, _ = self._parked.pop(alert_id)
+            if alert_id in active:
+                self.index.add(alert_id, *alert)
+                self.feed.watch([alert[1]])
+            else:
+                self._failures.pop(alert_id, None)
+
+    # Ticks every minute, but the scheduler only hands back symbols whose market is open
+    # and whose next poll is due, so most ticks fetch little or nothing. With a streaming
+    # feed, only symbols it hasn't ticked lately are polled; the rest fire from the stream.
+    @tasks.loop(minutes=1.0)
+    async def check_alerts(self):
+        # tasks.loop stops for good on an unexpected exception, so one bad tick must not escape
+        try:
+            if self.bot.is_split:
+                if time.monotonic() - self._synced_at > RESYNC_EVERY:
+                    await self.resync()
+                else:
+                    await self.pick_up_new()
+            await self.rearm_parked()
+            symbols = self.scheduler.due(self.feed.stale(self.index.symbols()))
+            if not symbols:
+                return
+
+            with alert_cycle_seconds.time():
+                prices = await self.feed.fetch(symbols)
+                self.fire_alerts(prices)
+                for symbol in symbols:
+                    self.scheduler.reschedule(symbol, prices.get(symbol), self.index)
+        except Exception as e:
+            print(f"Alert check failed: {e}")
 
     @check_alerts.before_loop
     async def before_check(self):
         await self.bot.wait_until_ready()
 
+    # With ALERT_WORKER set, alert_worker.py fires alerts into the outbox and this only sends them
+    @tasks.loop(seconds=2.0)
+    async def drain_outbox(self):
+        # e.g. "database is locked" while the workers write; claimed rows are retried after CLAIM_TIMEOUT
+        try:
+            while rows := await alert_outbox.claim(self.db):
+                await self.deliver_outbox(rows)
+        except Exception as e:
+            print(f"Alert outbox drain failed: {e}")
+
+    async def deliver_outbox(self, rows):
+        # Alerts removed since they fired are dropped rather than sent
+        active = await self.active_alert_ids([alert_id for _, alert_id, _, _, _ in rows])
+        # The workers export no metrics of their own, so the bot counts what they fired
+        alerts_fired.inc(len(rows))
+
+        by_user = defaultdict(list)
+        fired_at = {}
+        for _, alert_id, user_id, line, created_at in rows:
+            if alert_id in active:
+                by_user[user_id].append((alert_id, line))
+                fired_at[alert_id] = created_at
+        futures = {
+            user_id: self.dispatcher.submit(user_id, [line for _, line in entries])
+            for user_id, entries in by_user.items()
+        }
+        delivered = []
+        for user_id, future in futures.items():
+            if await future:
+                delivered.extend(alert_id for alert_id, _ in by_user[user_id])
+
+        await alert_outbox.complete(self.db, [outbox_id for outbox_id, _, _, _, _ in rows], delivered)
+        now = time.time()
+        for alert_id in delivered:
+            alert_delivery_seconds.observe(now - fired_at[alert_id])
+
+    @drain_outbox.before_loop
+    async def before_drain(self):
+        await self.bot.wait_until_ready()
+
 async def setup(bot):
     await bot.add_cog(Alerts(bot))
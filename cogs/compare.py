@@ -1,27 +1,30 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import yfinance as yf
-import matplotlib.pyplot as plt
 import io
-
-# Shared autocomplete list
-COMMON_TICKERS = [
-    "AAPL", "MSFT", "TSLA", "GOOGL", "AMZN", "NVDA", "META",
-    "VOO", "SPY", "QQQ", "QDV5.DE", "IE00BKM4GZ66"
-]
-
-async def autocomplete_ticker(interaction: discord.Interaction, current: str):
-    current = current.upper()
-    return [
-        app_commands.Choice(name=ticker, value=ticker)
-        for ticker in COMMON_TICKERS if current in ticker
-    ][:10]
+import asyncio
+from utils.tickers import autocomplete_ticker
+from utils import charts
+from utils.chart_cache import chart_cache, chart_key
 
 class Compare(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def fetch_series(self, tickers, period):
+        # Resolve the .DE fallbacks concurrently (usually straight from the validation cache),
+        # then pull every resolved symbol in one multi-ticker download
+        resolved = await asyncio.gather(*(self.bot.validator.validate(symbol) for symbol in tickers))
+        symbols = {ticker: symbol or ticker for ticker, symbol in zip(tickers, resolved)}
+        try:
+            frames = await self.bot.history.get_many(list(symbols.values()), period)
+        except Exception:
+            return []
+        return [
+            charts.series_from_frame(ticker, frames[symbol])
+            for ticker, symbol in symbols.items() if symbol in frames
+        ]
+
     @app_commands.command(
         name="compare",
         description="Compare up to 5 stocks/ETFs on a custom time chart."
@@ -32,7 +35,8 @@ class Compare(commands.Cog):
         symbol3="Optional third ticker",
         symbol4="Optional fourth ticker",
         symbol5="Optional fifth ticker",
-        period="Period (e.g., 7d, 1mo, 3mo, 1y)"
+        period="Period (e.g., 7d, 1mo, 3mo, 1y); defaults to your chart_days setting",
+        normalized="Rebase every line to 100 at the start to compare % returns"
     )
     @app_commands.autocomplete(
         symbol1=autocomplete_ticker,
@@ -49,56 +53,50 @@ class Compare(commands.Cog):
         symbol3: str = None,
         symbol4: str = None,
         symbol5: str = None,
-        period: str = "30d"
+        period: str = None,
+        normalized: bool = False
     ):
         await interaction.response.defer(ephemeral=True)
 
-        tickers = [s for s in [symbol1, symbol2, symbol3, symbol4, symbol5] if s]
+        # Sorted so the same set of symbols always maps to the same cached chart
+        tickers = sorted({s.upper() for s in [symbol1, symbol2, symbol3, symbol4, symbol5] if s})
         if len(tickers) < 2 or len(tickers) > 5:
             await interaction.followup.send("❌ Please provide between 2 and 5 symbols.", ephemeral=True)
             return
 
-        plt.figure(figsize=(10, 6))
-        success = False
-
-        for original_symbol in tickers:
-            symbol = original_symbol
-            try:
-                data = yf.Ticker(symbol).history(period=period)
+        if not period:
+            settings = await self.bot.settings.get(str(interaction.user.id))
+            period = f"{settings['chart_days']}d"
 
-                if data.empty and "." not in symbol:
-                    alt_symbol = symbol + ".DE"
-                    alt_data = yf.Ticker(alt_symbol).history(period=period)
-                    if not alt_data.empty:
-                        symbol = alt_symbol
-                        data = alt_data
+        key = chart_key("compare", tickers, period, normalized=normalized)
+        png = await chart_cache.get(key)
+        if png is None:
+            series = await self.fetch_series(tickers, period)
+            if normalized:
+                series = charts.normalize_series(series)
 
-                if not data.empty:
-                    plt.plot(data.index, data["Close"], label=original_symbol)
-                    success = True
-            except Exception:
-                continue
+            if not series:
+                await interaction.followup.send(
+                    "❌ Couldn't fetch valid price data for any of the provided symbols.",
+                    ephemeral=True
+                )
+                return
 
-        if not success:
-            await interaction.followup.send(
-                "❌ Couldn't fetch valid price data for any of the provided symbols.",
-                ephemeral=True
-            )
-            return
-
-        plt.title(f"Price Comparison ({period})")
-        plt.xlabel("Date")
-        plt.ylabel("Close Price (USD or Local Currency)")
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
-
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png")
-        buf.seek(0)
-        plt.close()
+            try:
+                if normalized:
+                    png = await charts.render(
+                        series, f"Normalized Return Comparison ({period})", ylabel="Value (start = 100)"
+                    )
+                else:
+                    png = await charts.render(
+                        series, f"Price Comparison ({period})", ylabel="Close Price (USD or Local Currency)"
+                    )
+            except charts.ChartQueueFull:
+                await interaction.followup.send("⏳ Lots of charts are rendering right now — try again in a moment.", ephemeral=True)
+                return
+            await chart_cache.put(key, png)
 
-        chart_file = discord.File(buf, filename="comparison.png")
+        chart_file = discord.File(io.BytesIO(png), filename="comparison.png")
         await interaction.followup.send("Here's your comparison chart:", file=chart_file)
 
 async def setup(bot):
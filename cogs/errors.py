@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+from utils import metrics
 
 class ErrorHandler(commands.Cog):
     def __init__(self, bot):
@@ -8,6 +9,8 @@ class ErrorHandler(commands.Cog):
 
         @bot.tree.error
         async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+            metrics.observe_command(interaction, "error")
+
             if isinstance(error, app_commands.CommandOnCooldown):
                 await interaction.response.send_message(
                     f"⏳ This command is on cooldown. Try again in {round(error.retry_after)} seconds.",
@@ -13,10 +13,12 @@ class Info(commands.Cog):
             description="Here are the available slash commands:",
             color=0x1abc9c
         )
-        embed.add_field(name="/add", value="Add a stock or ETF to your watchlist.", inline=False)
+        embed.add_field(name="/add", value="Add stocks or ETFs to your watchlist (comma-separate several).", inline=False)
         embed.add_field(name="/list", value="View your watchlist (optionally as a chart).", inline=False)
         embed.add_field(name="/remove", value="Remove a stock from your watchlist.", inline=False)
         embed.add_field(name="/clear", value="Clear your entire watchlist.", inline=False)
+        embed.add_field(name="/watchlist_import", value="Add every symbol from a CSV file.", inline=False)
+        embed.add_field(name="/watchlist_export", value="Download your watchlist as a CSV file.", inline=False)
 
         embed.add_field(name="/compare", value="Compare 2–5 stocks or ETFs over time.", inline=False)
 
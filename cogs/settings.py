@@ -1,24 +1,11 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import aiosqlite
-import os
 
-DB_PATH = "data/finance.db"
-os.makedirs("data", exist_ok=True)
-
-async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS user_settings (
-                user_id TEXT PRIMARY KEY,
-                currency TEXT DEFAULT 'USD',
-                chart_days INTEGER DEFAULT 30,
-                show_percentages INTEGER DEFAULT 1,
-                watchlist_limit INTEGER DEFAULT 10
-            )
-        ''')
-        await db.commit()
+def in_range(value, low, high):
+    if not low <= value <= high:
+        raise ValueError(f"{value} is outside {low}–{high}")
+    return value
 
 # Define the grouped commands
 class SettingsGroup(app_commands.Group):
@@ -32,14 +19,6 @@ class SettingsGroup(app_commands.Group):
         user_id = str(interaction.user.id)
         settings = await self.parent_cog.get_settings(user_id)
 
-        if not settings:
-            settings = {
-                "currency": "USD",
-                "chart_days": 30,
-                "show_percentages": 1,
-                "watchlist_limit": 10
-            }
-
         embed = discord.Embed(
             title="⚙️ Your FinancePal Settings",
             description="Here are your current preferences:",
@@ -63,9 +42,9 @@ class SettingsGroup(app_commands.Group):
         user_id = str(interaction.user.id)
         valid_fields = {
             "currency": str,
-            "chart_days": int,
+            "chart_days": lambda v: in_range(int(v), 1, 3650),
             "show_percentages": lambda v: v.lower() in ("true", "1", "yes"),
-            "watchlist_limit": int
+            "watchlist_limit": lambda v: in_range(int(v), 1, 25)
         }
 
         if field not in valid_fields:
@@ -90,25 +69,13 @@ class Settings(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         bot.tree.add_command(SettingsGroup(self))
-        bot.loop.create_task(init_db())
+        self.store = bot.settings
 
     async def save_setting(self, user_id, field, value):
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(f'''
-                INSERT INTO user_settings (user_id, {field})
-                VALUES (?, ?)
-                ON CONFLICT(user_id) DO UPDATE SET {field} = excluded.{field}
-            ''', (user_id, value))
-            await db.commit()
+        await self.store.save(user_id, field, value)
 
     async def get_settings(self, user_id):
-        async with aiosqlite.connect(DB_PATH) as db:
-            cursor = await db.execute("SELECT * FROM user_settings WHERE user_id = ?", (user_id,))
-            row = await cursor.fetchone()
-            if row:
-                keys = [column[0] for column in cursor.description]
-                return dict(zip(keys, row))
-            return None
+        return await self.store.get(user_id)
 
 async def setup(bot):
     await bot.add_cog(Settings(bot))
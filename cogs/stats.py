@@ -0,0 +1,110 @@
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+import asyncio
+import os
+from utils import market, metrics
+from utils.chart_cache import chart_cache
+
+METRICS_PORT = os.getenv("METRICS_PORT")  # serve Prometheus text on 127.0.0.1:<port>
+METRICS_FILE = os.getenv("METRICS_FILE")  # or write it to a file for node_exporter's textfile collector
+
+def _ms(seconds):
+    return "—" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+def _histogram_lines(histogram, label, limit=10):
+    rows = sorted(histogram.series, key=histogram.count, reverse=True)[:limit]
+    lines = []
+    for key in rows:
+        name = dict(key).get(label, "all")
+        lines.append(
+            f"`{name}` ×{histogram.count(key)} · p50 {_ms(histogram.quantile(0.5, key))}"
+            f" · p99 {_ms(histogram.quantile(0.99, key))}"
+        )
+    return "\n".join(lines) or "No data yet."
+
+class Stats(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self._server = None
+        self._writer = None
+        self._alert_total = 0  # from the alerts table, when this process holds no alert index
+
+    async def cog_load(self):
+        registry = metrics.registry
+        registry.gauge("financepal_cache_hits", "Cache hits since start", lambda: self.cache_stats("hits"))
+        registry.gauge("financepal_cache_misses", "Cache misses since start", lambda: self.cache_stats("misses"))
+        registry.gauge("financepal_cache_entries", "Entries held in memory caches", lambda: self.cache_stats("size"))
+        registry.gauge("financepal_active_alerts", "Active price alerts", self.alert_count)
+        registry.gauge("financepal_seen_users", "Users who have been welcomed", lambda: {(): len(self.bot.seen_users)})
+
+        if METRICS_PORT:
+            self._server = await metrics.serve(int(METRICS_PORT))
+            print(f"📈 Prometheus metrics on 127.0.0.1:{METRICS_PORT}")
+        if METRICS_FILE:
+            self._writer = asyncio.create_task(metrics.write_periodically(METRICS_FILE))
+        self.count_alerts.start()
+
+    async def cog_unload(self):
+        self.count_alerts.cancel()
+        if self._server:
+            self._server.close()
+        if self._writer:
+            self._writer.cancel()
+
+    def cache_stats(self, field):
+        stats = {
+            "quote": market.quote_cache.stats(),
+            "settings": self.bot.settings.stats(),
+            "chart": {"hits": chart_cache.hits, "misses": chart_cache.misses},
+        }
+        return {(("cache", name),): s[field] for name, s in stats.items() if field in s}
+
+    def _evaluating(self):
+        alerts = self.bot.get_cog("Alerts")
+        return alerts if alerts and alerts.evaluates else None
+
+    def alert_count(self):
+        alerts = self._evaluating()
+        return {(): len(alerts.index) if alerts else self._alert_total}
+
+    # Alert workers (or the primary shard's process) evaluate elsewhere; count the table instead
+    @tasks.loop(minutes=1.0)
+    async def count_alerts(self):
+        if self._evaluating():
+            return
+        try:
+            row = await self.bot.db.fetchone("SELECT COUNT(*) FROM alerts")
+            self._alert_total = row[0] if row else 0
+        except Exception as e:
+            print(f"Alert count failed: {e}")
+
+    @app_commands.command(name="stats", description="Show FinancePal performance metrics (admin only).")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def stats(self, interaction: discord.Interaction):
+        embed = discord.Embed(title="📈 FinancePal Stats", color=0x745fed)
+        embed.add_field(name="Commands", value=_histogram_lines(metrics.command_seconds, "command"), inline=False)
+        embed.add_field(name="yfinance", value=_histogram_lines(metrics.market_seconds, "call"), inline=False)
+        embed.add_field(name="Database", value=_histogram_lines(metrics.db_seconds, "op"), inline=False)
+
+        hits, misses = self.cache_stats("hits"), self.cache_stats("misses")
+        cache_lines = []
+        for key, h in hits.items():
+            m = misses.get(key, 0)
+            ratio = h / (h + m) if h + m else 0
+            cache_lines.append(f"`{key[0][1]}` {h} hits / {m} misses · {ratio:.0%}")
+        embed.add_field(name="Caches", value="\n".join(cache_lines), inline=False)
+
+        if self._evaluating():
+            timing = "Cycle: " + _histogram_lines(metrics.alert_cycle_seconds, "cycle", limit=1)
+        else:
+            timing = "Fired → DM: " + _histogram_lines(metrics.alert_delivery_seconds, "delivery", limit=1)
+        embed.add_field(
+            name="Alerts",
+            value=f"{self.alert_count()[()]} active · {metrics.alerts_fired.total()} fired\n{timing}",
+            inline=False
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Stats(bot))
@@ -1,146 +1,258 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
-import aiosqlite
-import os
-import yfinance as yf
-import matplotlib.pyplot as plt
 import io
+import csv
 import asyncio
+import tempfile
+from utils.tickers import autocomplete_ticker_list
+from utils import charts
+from utils.validation import looks_like_isin
+from utils.chart_cache import chart_cache, chart_key
+from utils.price_snapshot import REFRESH_EVERY
 
-DB_PATH = "data/finance.db"
-os.makedirs("data", exist_ok=True)
+MAX_SYMBOLS_PER_ADD = 200  # per /add or /watchlist_import
+MAX_IMPORT_BYTES = 256 * 1024
+SUMMARY_SYMBOLS = 40  # listed per line of a bulk-add reply before "+N more"
+PAGE_SIZE = 10  # symbols per /list page
+PAGER_TIMEOUT = 300.0
 
-async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS watchlists (
-                user_id TEXT,
-                symbol TEXT
+def split_symbols(text):
+    return list(dict.fromkeys(s.strip().upper() for s in text.split(",") if s.strip()))
+
+def symbols_from_csv(data):
+    # The "symbol" (or "ticker") column if there is a header, otherwise the first column
+    symbols = []
+    column = None
+    for row in csv.reader(io.StringIO(data.decode("utf-8-sig"))):
+        if not row:
+            continue
+        if column is None:
+            header = [cell.strip().lower() for cell in row]
+            column = next((header.index(name) for name in ("symbol", "ticker") if name in header), 0)
+            if header[column] in ("symbol", "ticker"):
+                continue
+        if column < len(row) and row[column].strip():
+            symbols.append(row[column].strip().upper())
+    return list(dict.fromkeys(symbols))
+
+def format_symbols(symbols):
+    shown = ", ".join(f"`{s}`" for s in symbols[:SUMMARY_SYMBOLS])
+    if len(symbols) > SUMMARY_SYMBOLS:
+        shown += f" +{len(symbols) - SUMMARY_SYMBOLS} more"
+    return shown
+
+def bulk_summary(added, already, invalid):
+    lines = []
+    if added:
+        lines.append(f"\u2705 Added {len(added)}: {format_symbols(added)}")
+    if already:
+        lines.append(f"\u26a0\ufe0f Already in your watchlist: {format_symbols(already)}")
+    if invalid:
+        lines.append(f"\u274c Could not validate: {format_symbols(invalid)}")
+    return "\n".join(lines)
+
+def price_line(symbol, quote, show_percentages=True):
+    if quote is None:
+        return f"\u2022 `{symbol}` — \u26a0\ufe0f price unavailable"
+    price, change = quote
+    if not show_percentages or change is None:
+        return f"\u2022 `{symbol}` — ${price:.2f}"
+    return f"\u2022 `{symbol}` — ${price:.2f} ({change:+.2f}%)"
+
+# /list as pages of PAGE_SIZE symbols. Prices come from the shared snapshot; anything it
+# doesn't cover yet is fetched only for the page being shown, and the next page is loaded
+# in the background so "Next" is usually instant.
+class WatchlistPager(discord.ui.View):
+    def __init__(self, cog, user_id, symbols, show_percentages):
+        super().__init__(timeout=PAGER_TIMEOUT)
+        self.cog = cog
+        self.user_id = user_id
+        self.symbols = symbols
+        self.show_percentages = show_percentages
+        self.page = 0
+        self.page_count = max(1, -(-len(symbols) // PAGE_SIZE))
+        self.message = None
+        self._pages = {}  # page -> Task resolving to its lines
+
+    def _load(self, page):
+        task = self._pages.get(page)
+        if task is None:
+            chunk = self.symbols[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+            task = self._pages[page] = asyncio.create_task(
+                self.cog.format_price_lines(chunk, self.show_percentages)
             )
-        ''')
-        await db.commit()
-
-# ✅ Autocomplete setup
-COMMON_TICKERS = [
-    "AAPL", "MSFT", "TSLA", "GOOGL", "AMZN", "NVDA", "META",
-    "VOO", "SPY", "QQQ", "QDV5.DE", "IE00BKM4GZ66"
-]
-
-async def autocomplete_ticker(interaction: discord.Interaction, current: str):
-    current = current.upper()
-    return [
-        app_commands.Choice(name=ticker, value=ticker)
-        for ticker in COMMON_TICKERS if current in ticker
-    ][:10]
+        return task
+
+    async def render(self):
+        lines = await self._load(self.page)
+        if self.page + 1 < self.page_count:
+            self._load(self.page + 1)
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page + 1 >= self.page_count
+
+        embed = discord.Embed(title="\ud83d\udcc8 Your Watchlist", description="\n".join(lines), color=0x745fed)
+        embed.set_footer(text=f"Page {self.page + 1}/{self.page_count} \u2022 {len(self.symbols)} symbols")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return str(interaction.user.id) == self.user_id
+
+    async def _turn(self, interaction, step):
+        self.page = min(max(self.page + step, 0), self.page_count - 1)
+        await interaction.response.defer()
+        await interaction.edit_original_response(embed=await self.render(), view=self)
+
+    @discord.ui.button(label="\u25c0 Prev", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, -1)
+
+    @discord.ui.button(label="Next \u25b6", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, 1)
+
+    async def on_timeout(self):
+        for task in self._pages.values():
+            task.cancel()
+        if self.message is None:
+            return
+        for item in self.children:
+            item.disabled = True
+        try:
+            await self.message.edit(view=self)
+        except discord.HTTPException:
+            pass
 
 class Watchlist(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        bot.loop.create_task(init_db())
+        self.db = bot.db
+
+    async def cog_load(self):
+        self.refresh_snapshot.start()
+
+    async def cog_unload(self):
+        self.refresh_snapshot.cancel()
+
+    # Sharded across processes, one process downloads and the others pick up its table
+    @tasks.loop(seconds=REFRESH_EVERY)
+    async def refresh_snapshot(self):
+        try:
+            if self.bot.is_primary:
+                await self.bot.snapshot.refresh()
+            else:
+                await self.bot.snapshot.load()
+        except Exception as e:
+            print(f"Price snapshot refresh failed: {e}")
+
+    @refresh_snapshot.before_loop
+    async def before_refresh(self):
+        # Serve the last snapshot from the table while the first refresh runs
+        await self.bot.snapshot.load()
 
     async def get_watchlist(self, user_id):
-        async with aiosqlite.connect(DB_PATH) as db:
-            cursor = await db.execute("SELECT symbol FROM watchlists WHERE user_id = ?", (user_id,))
-            return [r[0] for r in await cursor.fetchall()]
+        rows = await self.db.fetchall("SELECT symbol FROM watchlists WHERE user_id = ?", (user_id,))
+        return [r[0] for r in rows]
 
     async def add_to_watchlist(self, user_id, symbol):
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute("INSERT INTO watchlists (user_id, symbol) VALUES (?, ?)", (user_id, symbol))
-            await db.commit()
+        added = await self.db.execute(
+            "INSERT OR IGNORE INTO watchlists (user_id, symbol) VALUES (?, ?)", (user_id, symbol)
+        )
+        return added > 0
+
+    async def add_many_to_watchlist(self, user_id, symbols):
+        # One executemany transaction for the lot; returns the symbols that were new
+        existing = set(await self.get_watchlist(user_id))
+        new = [symbol for symbol in dict.fromkeys(symbols) if symbol not in existing]
+        if new:
+            await self.db.executemany(
+                "INSERT OR IGNORE INTO watchlists (user_id, symbol) VALUES (?, ?)",
+                [(user_id, symbol) for symbol in new]
+            )
+        return new
+
+    async def bulk_add(self, user_id, queries):
+        results = await self.bot.validator.validate_many(queries)
+        valid = list(dict.fromkeys(symbol for symbol in results.values() if symbol))
+        invalid = [query for query, symbol in results.items() if not symbol]
+        added = await self.add_many_to_watchlist(user_id, valid)
+        already = [symbol for symbol in valid if symbol not in added]
+        return added, already, invalid
 
     async def remove_from_watchlist(self, user_id, symbol):
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute("DELETE FROM watchlists WHERE user_id = ? AND symbol = ?", (user_id, symbol))
-            await db.commit()
+        await self.db.execute("DELETE FROM watchlists WHERE user_id = ? AND symbol = ?", (user_id, symbol))
 
     async def clear_watchlist(self, user_id):
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute("DELETE FROM watchlists WHERE user_id = ?", (user_id,))
-            await db.commit()
+        await self.db.execute("DELETE FROM watchlists WHERE user_id = ?", (user_id,))
 
     async def validate_ticker(self, stock):
-        try:
-            ticker = yf.Ticker(stock)
-            hist = ticker.history(period="1d")
-            if hist.empty and "." not in stock:
-                alt_stock = stock + ".DE"
-                alt_hist = yf.Ticker(alt_stock).history(period="1d")
-                if not alt_hist.empty:
-                    return alt_stock
-            elif not hist.empty:
-                return stock
-        except Exception:
-            pass
-        return None
+        return await self.bot.validator.validate(stock)
 
-    async def format_price_line(self, symbol):
-        try:
-            hist = yf.Ticker(symbol).history(period="2d")
-            if len(hist) >= 2:
-                latest = hist["Close"].iloc[-1]
-                prev = hist["Close"].iloc[-2]
-                change = ((latest - prev) / prev) * 100
-                return f"\u2022 `{symbol}` — ${latest:.2f} ({change:+.2f}%)"
-        except Exception:
-            pass
-        return f"\u2022 `{symbol}` — \u26a0\ufe0f price unavailable"
+    async def format_price_lines(self, symbols, show_percentages=True):
+        # A local lookup unless a symbol isn't in the snapshot yet; those share one download
+        snapshot = self.bot.snapshot
+        quotes = {symbol: snapshot.get(symbol) for symbol in symbols}
+        missing = [symbol for symbol, quote in quotes.items() if quote is None]
+        if missing:
+            try:
+                quotes.update(await snapshot.fetch(missing))
+            except Exception:
+                pass
+        return [price_line(symbol, quotes[symbol], show_percentages) for symbol in symbols]
 
-    async def generate_chart(self, watchlist):
-        plt.figure(figsize=(10, 6))
-        success = False
-        for symbol in watchlist[:10]:
+    async def generate_chart(self, watchlist, days=30, limit=10):
+        symbols = sorted(watchlist[:limit])
+        period = f"{days}d"
+        key = chart_key("watchlist", symbols, period)
+        png = await chart_cache.get(key)
+        if png is None:
             try:
-                hist = yf.Ticker(symbol).history(period="30d")
-                if not hist.empty:
-                    plt.plot(hist.index, hist["Close"], label=symbol)
-                    success = True
+                frames = await self.bot.history.get_many(symbols, period)
             except Exception:
-                continue
+                return None
+            series = [charts.series_from_frame(symbol, frames[symbol]) for symbol in symbols if symbol in frames]
+            if not series:
+                return None
+
+            png = await charts.render(series, f"Watchlist Performance ({period})", rotate_xticks=True)
+            await chart_cache.put(key, png)
+        return discord.File(io.BytesIO(png), filename="watchlist_chart.png")
 
-        if not success:
-            return None
-
-        plt.title("Watchlist Performance (30d)")
-        plt.xlabel("Date")
-        plt.ylabel("Close Price")
-        plt.xticks(rotation=45)
-        plt.grid(True)
-        plt.legend()
-        plt.tight_layout()
-
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png")
-        buf.seek(0)
-        plt.close()
-        return discord.File(buf, filename="watchlist_chart.png")
-
-    @app_commands.command(name="add", description="Add a stock or ETF to your watchlist.")
-    @app_commands.describe(stock="Stock or ETF symbol (e.g., AAPL, VOO, QDV5.DE)")
-    @app_commands.autocomplete(stock=autocomplete_ticker)
+    @app_commands.command(name="add", description="Add stocks or ETFs to your watchlist.")
+    @app_commands.describe(stock="Symbol, or several separated by commas (e.g., AAPL, VOO, QDV5.DE)")
+    @app_commands.autocomplete(stock=autocomplete_ticker_list)
     async def add(self, interaction: discord.Interaction, stock: str):
         await interaction.response.defer(ephemeral=True)
         user_id = str(interaction.user.id)
-        stock = stock.upper()
 
-        if len(stock) == 12 and stock[:2].isalpha() and stock[2:].isdigit():
-            await interaction.followup.send(
-                f"\u26a0\ufe0f `{stock}` looks like an ISIN. Use a stock symbol like `AAPL`, `MSFT`, or `QDV5.DE`.",
-                ephemeral=True
-            )
+        symbols = split_symbols(stock)
+        if len(symbols) > 1:
+            if len(symbols) > MAX_SYMBOLS_PER_ADD:
+                await interaction.followup.send(
+                    f"\u274c You can add up to {MAX_SYMBOLS_PER_ADD} symbols at once.", ephemeral=True
+                )
+                return
+            added, already, invalid = await self.bulk_add(user_id, symbols)
+            await interaction.followup.send(bulk_summary(added, already, invalid), ephemeral=True)
             return
 
+        stock = symbols[0] if symbols else stock.upper()
+
         valid_stock = await self.validate_ticker(stock)
         if not valid_stock:
-            await interaction.followup.send(f"\u274c Could not validate `{stock}`.", ephemeral=True)
+            if looks_like_isin(stock):
+                await interaction.followup.send(
+                    f"\u26a0\ufe0f Couldn't find a listing for ISIN `{stock}`. Try a stock symbol like `AAPL`, `MSFT`, or `QDV5.DE`.",
+                    ephemeral=True
+                )
+            else:
+                await interaction.followup.send(f"\u274c Could not validate `{stock}`.", ephemeral=True)
             return
 
-        watchlist = await self.get_watchlist(user_id)
-        if valid_stock in watchlist:
+        if not await self.add_to_watchlist(user_id, valid_stock):
             await interaction.followup.send(f"\u26a0\ufe0f `{valid_stock}` is already in your watchlist.", ephemeral=True)
             return
 
-        await self.add_to_watchlist(user_id, valid_stock)
         await interaction.followup.send(f"\u2705 Added `{valid_stock}` to your watchlist.", ephemeral=True)
 
     @app_commands.command(name="list", description="View your watchlist with current prices or a performance chart.")
@@ -153,16 +265,88 @@ class Watchlist(commands.Cog):
             await interaction.followup.send("\ud83d\udccd Your watchlist is empty.", ephemeral=True)
             return
 
+        settings = await self.bot.settings.get(user_id)
         if chart:
-            chart_file = await self.generate_chart(watchlist)
+            try:
+                chart_file = await self.generate_chart(
+                    watchlist, days=settings["chart_days"], limit=settings["watchlist_limit"]
+                )
+            except charts.ChartQueueFull:
+                await interaction.followup.send("\u23f3 Lots of charts are rendering right now — try again in a moment.", ephemeral=True)
+                return
             if chart_file:
                 await interaction.followup.send("\ud83d\udcca Here's your watchlist performance chart:", file=chart_file)
             else:
                 await interaction.followup.send("\u274c Could not generate chart — no valid price data.", ephemeral=True)
             return
 
-        rows = await asyncio.gather(*(self.format_price_line(symbol) for symbol in watchlist))
-        await interaction.followup.send("\ud83d\udcc8 Your Watchlist:\n" + "\n".join(rows), ephemeral=True)
+        pager = WatchlistPager(self, user_id, watchlist, bool(settings["show_percentages"]))
+        embed = await pager.render()
+        if pager.page_count == 1:
+            pager.stop()
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        pager.message = await interaction.followup.send(embed=embed, view=pager, ephemeral=True, wait=True)
+
+    @app_commands.command(name="watchlist_import", description="Add every symbol from a CSV file to your watchlist.")
+    @app_commands.describe(file="CSV with a 'symbol' column, or one symbol per line")
+    async def watchlist_import(self, interaction: discord.Interaction, file: discord.Attachment):
+        await interaction.response.defer(ephemeral=True)
+        user_id = str(interaction.user.id)
+
+        if file.size > MAX_IMPORT_BYTES:
+            await interaction.followup.send(
+                f"\u274c That file is too large (max {MAX_IMPORT_BYTES // 1024} KB).", ephemeral=True
+            )
+            return
+        try:
+            symbols = symbols_from_csv(await file.read())
+        except (UnicodeDecodeError, csv.Error):
+            await interaction.followup.send("\u274c Couldn't read that file — please upload a UTF-8 CSV.", ephemeral=True)
+            return
+
+        if not symbols:
+            await interaction.followup.send("\u274c No symbols found in that file.", ephemeral=True)
+            return
+        if len(symbols) > MAX_SYMBOLS_PER_ADD:
+            await interaction.followup.send(
+                f"\u274c You can import up to {MAX_SYMBOLS_PER_ADD} symbols at once.", ephemeral=True
+            )
+            return
+
+        added, already, invalid = await self.bulk_add(user_id, symbols)
+        await interaction.followup.send(bulk_summary(added, already, invalid), ephemeral=True)
+
+    @app_commands.command(name="watchlist_export", description="Download your watchlist as a CSV file.")
+    async def watchlist_export(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        user_id = str(interaction.user.id)
+
+        # Rows go straight from the cursor into a spooled file (kept in memory until it gets big)
+        buffer = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        text = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+        writer = csv.writer(text)
+        writer.writerow(["symbol"])
+        count = 0
+        async for (symbol,) in self.db.iterate(
+            "SELECT symbol FROM watchlists WHERE user_id = ? ORDER BY symbol", (user_id,)
+        ):
+            writer.writerow([symbol])
+            count += 1
+        text.flush()
+        text.detach()
+
+        if not count:
+            buffer.close()
+            await interaction.followup.send("\ud83d\udccd Your watchlist is empty.", ephemeral=True)
+            return
+
+        buffer.seek(0)
+        await interaction.followup.send(
+            f"\ud83d\udcc4 Your watchlist ({count} symbols):",
+            file=discord.File(buffer, filename="watchlist.csv"),
+            ephemeral=True
+        )
 
     @app_commands.command(name="remove", description="Remove a stock or ETF from your watchlist.")
     async def remove(self, interaction: discord.Interaction, stock: str):
@@ -1,57 +1,178 @@
 # main.py
 import os
+import asyncio
+import hashlib
+import json
+import time
 import discord
 from discord.ext import commands
 from discord import app_commands
 from dotenv import load_dotenv
-import aiosqlite
+from utils import market, charts, metrics
+from utils.db import Database
+from utils.migrations import migrate
+from utils.seen_users import SeenUsers
+from utils.history import HistoryStore
+from utils.validation import TickerValidator
+from utils.settings_store import SettingsStore
+from utils.price_snapshot import PriceSnapshot
+from utils.tickers import ticker_index
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 APP_ID = 1370900483174174780  # your real App ID (optional; see note below)
 DEV_GUILD_ID = os.getenv("DEV_GUILD_ID")  # set to a guild ID string during dev, or leave unset for global
 
+# Sharding is optional. SHARD_COUNT=auto lets Discord pick the count and runs every shard here;
+# a number plus SHARD_IDS (e.g. "0-3" or "4,5,6,7") runs just that slice in this process.
+SHARD_COUNT = os.getenv("SHARD_COUNT")
+SHARD_IDS = os.getenv("SHARD_IDS")
+SETTINGS_CACHE_SIZE = int(os.getenv("SETTINGS_CACHE_SIZE", "50000"))
+# One user reaches a different process per guild's shard, and a save in one process doesn't
+# reach the other processes' caches; when split, cached settings expire after this long (s)
+SHARDED_SETTINGS_TTL = float(os.getenv("SHARDED_SETTINGS_TTL", "60"))
+
 intents = discord.Intents.default()
 intents.message_content = True  # not required for slash, but fine if you need it
 
-DB_PATH = "data/finance.db"
-os.makedirs("data", exist_ok=True)
+# Important: cogs must NOT call tree.sync() themselves.
+EXTENSIONS = (
+    "cogs.core",
+    "cogs.watchlist",
+    "cogs.compare",
+    "cogs.settings",
+    "cogs.alerts",
+    "cogs.info",
+    "cogs.errors",
+    "cogs.stats",
+)
+
+def parse_shard_ids(value):
+    ids = set()
+    for part in value.split(","):
+        first, _, last = part.strip().partition("-")
+        ids.update(range(int(first), int(last or first) + 1))
+    return sorted(ids)
+
+def shard_options():
+    if not SHARD_COUNT or SHARD_COUNT == "auto":
+        if SHARD_IDS:
+            # Silently running every shard here would double up with the other processes
+            raise ValueError("SHARD_IDS needs a numeric SHARD_COUNT (the total across all processes)")
+        return {}
+    options = {"shard_count": int(SHARD_COUNT)}
+    if SHARD_IDS:
+        options["shard_ids"] = parse_shard_ids(SHARD_IDS)
+    return options
+
+def shard_share():
+    # Fraction of all shards this process serves; per-process caches are sized by it
+    options = shard_options()
+    if "shard_ids" not in options:
+        return 1.0
+    return len(options["shard_ids"]) / options["shard_count"]
+
+def per_shard(size, floor):
+    return max(floor, int(size * shard_share()))
 
-class FinancePal(commands.Bot):
+def command_fingerprint(tree, guild=None):
+    # Stable hash of exactly what tree.sync() would upload for this scope
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command.get("type", 1), command["name"])
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+class FinancePalTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction):
+        interaction.extras["started_at"] = time.perf_counter()
+        return True
+
+class FinancePal(commands.AutoShardedBot if SHARD_COUNT else commands.Bot):
     def __init__(self):
         super().__init__(
             command_prefix="!",
             intents=intents,
-            application_id=APP_ID  # You can also omit this; discord.py will resolve it after login
+            tree_cls=FinancePalTree,
+            application_id=APP_ID,  # You can also omit this; discord.py will resolve it after login
+            **shard_options()
         )
         self._synced_once = False  # guard against duplicate syncs on reconnects
+        self._started_at = time.perf_counter()
+        self._phase_started = self._started_at
+        self.startup_timings = []
+        self.db = Database()
+        self.seen_users = SeenUsers(self.db)
+        self.history = HistoryStore(self.db)
+        self.validator = TickerValidator(self.db)
+        self.snapshot = PriceSnapshot(self.db)
+        self.settings = SettingsStore(
+            self.db,
+            maxsize=per_shard(SETTINGS_CACHE_SIZE, 1000),
+            ttl=SHARDED_SETTINGS_TTL if self.is_split else 0
+        )
+        market.quote_cache.maxsize = per_shard(market.QUOTE_CACHE_SIZE, 512)
+
+    @property
+    def is_primary(self):
+        # Process-wide jobs (in-process alert checks) run once: in the process holding shard 0
+        options = shard_options()
+        return 0 in options.get("shard_ids", [0])
+
+    @property
+    def is_split(self):
+        # Other processes serve the remaining shards and write to the same database
+        return "shard_ids" in shard_options()
+
+    def mark_phase(self, name):
+        now = time.perf_counter()
+        self.startup_timings.append((name, now - self._phase_started))
+        self._phase_started = now
+
+    def startup_report(self):
+        lines = [f"   {name:<14} {seconds * 1000:8.0f} ms" for name, seconds in self.startup_timings]
+        total = time.perf_counter() - self._started_at
+        return "⏱️ Startup timings:\n" + "\n".join(lines) + f"\n   {'total':<14} {total * 1000:8.0f} ms"
 
     async def setup_hook(self):
+        # Heavy imports and chart workers warm up in the background while the rest starts
+        charts.start()
+        self._warmups = [
+            asyncio.create_task(market.warm_up()),
+            asyncio.create_task(asyncio.to_thread(ticker_index.load)),
+        ]
+
+        await self.db.connect()
+        # Schema must be current before any cog serves a command
+        await migrate(self.db)
+        self.mark_phase("database")
+
+        await self.seen_users.load()
+        self.seen_users.start()
+        self.mark_phase("seen users")
+
         print("🔄 Loading cogs...")
-        # Important: cogs must NOT call tree.sync() themselves.
-        await self.load_extension("cogs.core")
-        await self.load_extension("cogs.watchlist")
-        await self.load_extension("cogs.compare")
-        await self.load_extension("cogs.settings")
-        await self.load_extension("cogs.alerts")
-        await self.load_extension("cogs.info")
-        await self.load_extension("cogs.errors")
+        await asyncio.gather(*(self.load_extension(name) for name in EXTENSIONS))
         print("✅ All cogs loaded.")
-
-        # Create seen_users table
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS seen_users (
-                    user_id TEXT PRIMARY KEY
-                )
-            ''')
-            await db.commit()
+        self.mark_phase("cogs")
 
         # Add a small healthcheck for quick verification in your dev guild
         @app_commands.command(name="ping", description="Health check")
         async def ping(interaction: discord.Interaction):
+            stats = market.quote_cache.stats()
+            client = interaction.client
+            shard_id = interaction.guild.shard_id if interaction.guild else 0
+            if isinstance(client, commands.AutoShardedBot):
+                shard = client.get_shard(shard_id)
+                latency = shard.latency if shard else client.latency
+                shards = " · ".join(f"#{i} {l * 1000:.0f}ms" for i, l in client.latencies)
+                shard_line = f"shard {shard_id}/{client.shard_count} · {latency * 1000:.0f}ms\nshards here: {shards}\n"
+            else:
+                shard_line = f"unsharded · {client.latency * 1000:.0f}ms\n"
             await interaction.response.send_message(
-                f"pong · app={interaction.client.application_id} · guild={interaction.guild_id}"
+                f"pong · app={client.application_id} · guild={interaction.guild_id}\n{shard_line}"
+                f"quote cache · {stats['size']} entries · {stats['hits']} hits / {stats['misses']} misses"
+                f" · {stats['coalesced']} coalesced · {stats['hit_ratio']:.0%} hit ratio"
             )
 
         # If a dev guild is set, register /ping only there for fast propagation
@@ -61,65 +182,106 @@ class FinancePal(commands.Bot):
             # Otherwise make it global
             self.tree.add_command(ping)
 
+    async def sync_commands(self, guild=None, force=False):
+        # Syncing is rate limited, so skip it when the tree matches what we last uploaded
+        key = f"command_fingerprint:{guild.id if guild else 'global'}"
+        fingerprint = command_fingerprint(self.tree, guild=guild)
+        row = await self.db.fetchone("SELECT value FROM bot_meta WHERE key = ?", (key,))
+        if not force and row and row[0] == fingerprint:
+            return None
+
+        cmds = await self.tree.sync(guild=guild)
+        await self.db.execute(
+            "INSERT OR REPLACE INTO bot_meta (key, value) VALUES (?, ?)", (key, fingerprint)
+        )
+        return cmds
+
+    async def close(self):
+        for task in getattr(self, "_warmups", ()):
+            task.cancel()
+        market.shutdown()
+        charts.shutdown()
+        await super().close()
+        await self.seen_users.close()
+        await self.db.close()
+
+    async def on_shard_ready(self, shard_id):
+        print(f"🔹 Shard {shard_id} ready")
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        metrics.observe_command(interaction, "ok")
+
     async def on_interaction(self, interaction: discord.Interaction):
-        # Welcome DM on first interaction
+        # Welcome DM on first interaction. Membership is answered from memory and new users
+        # are persisted in the background, so no interaction waits on the database.
+        # The command tree dispatches the interaction on its own; nothing to forward here.
         if interaction.user and not interaction.user.bot:
-            user_id = str(interaction.user.id)
-            async with aiosqlite.connect(DB_PATH) as db:
-                cursor = await db.execute("SELECT 1 FROM seen_users WHERE user_id = ?", (user_id,))
-                seen = await cursor.fetchone()
-
-                if not seen:
-                    try:
-                        await interaction.user.send(
-                            "**👋 Welcome to FinancePal!**\n\n"
-                            "Thanks for trying out the bot. Use `/help` to view available commands and `/settings` to personalize your experience.\n\n"
-                            "Need help? Use `/info` or contact the developer!"
-                        )
-                    except discord.Forbidden:
-                        pass  # User has DMs closed
-
-                    await db.execute("INSERT INTO seen_users (user_id) VALUES (?)", (user_id,))
-                    await db.commit()
-
-        # Let discord.py process slash commands as usual
-        await super().on_interaction(interaction)
-
-bot = FinancePal()
-
-@bot.event
-async def on_ready():
-    print(f"✅ FinancePal is online as {bot.user} (ID: {bot.user.id})")
-    print(f"application_id: {bot.application_id}")
-    print(f"Cogs loaded: {list(bot.extensions.keys())}")
-
-    # One-time controlled sync to avoid duplicates
-    if not bot._synced_once:
-        if DEV_GUILD_ID:
-            guild = discord.Object(id=int(DEV_GUILD_ID))
-            # 👉 Do NOT clear — just sync to the guild for instant updates
-            cmds = await bot.tree.sync(guild=guild)
-            print(f"🔁 Synced {len(cmds)} commands to DEV guild {DEV_GUILD_ID}")
+            # Several processes share the seen_users table when sharded, so let the database decide
+            if self.is_split:
+                first_time = await self.seen_users.claim(interaction.user.id)
+            else:
+                first_time = self.seen_users.mark(interaction.user.id)
+            if first_time:
+                try:
+                    await interaction.user.send(
+                        "**👋 Welcome to FinancePal!**\n\n"
+                        "Thanks for trying out the bot. Use `/help` to view available commands and `/settings` to personalize your experience.\n\n"
+                        "Need help? Use `/info` or contact the developer!"
+                    )
+                except discord.Forbidden:
+                    pass  # User has DMs closed
+
+# Built only when run as a script: spawned chart workers re-import this module as
+# __mp_main__ and must not construct a bot (database, caches, ...) of their own.
+def create_bot():
+    bot = FinancePal()
+
+    @bot.event
+    async def on_ready():
+        print(f"✅ FinancePal is online as {bot.user} (ID: {bot.user.id})")
+        print(f"application_id: {bot.application_id}")
+        print(f"Cogs loaded: {list(bot.extensions.keys())}")
+
+        bot.mark_phase("gateway ready")
+
+        # One-time controlled sync to avoid duplicates
+        if not bot._synced_once:
+            if DEV_GUILD_ID:
+                guild = discord.Object(id=int(DEV_GUILD_ID))
+                # 👉 Do NOT clear — just sync to the guild for instant updates
+                cmds = await bot.sync_commands(guild=guild)
+                if cmds is None:
+                    print(f"⏭️ Commands unchanged for DEV guild {DEV_GUILD_ID}; skipped sync")
+                else:
+                    print(f"🔁 Synced {len(cmds)} commands to DEV guild {DEV_GUILD_ID}")
+            else:
+                # Global sync (slower to propagate; use when ready)
+                cmds = await bot.sync_commands()
+                if cmds is None:
+                    print("⏭️ Global commands unchanged; skipped sync")
+                else:
+                    print(f"🌍 Synced {len(cmds)} global commands")
+            bot._synced_once = True
+            bot.mark_phase("command sync")
+            print(bot.startup_report())
+
+    # Admin-only resync command (safe)
+    @bot.tree.command(name="sync", description="Force-resync slash commands here.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def sync_cmd(interaction: discord.Interaction):
+        if interaction.guild:
+            guild = discord.Object(id=interaction.guild.id)
+            cmds = await bot.sync_commands(guild=guild, force=True)
+            await interaction.response.send_message(
+                f"✅ Synced {len(cmds)} commands to this guild.", ephemeral=True
+            )
         else:
-            # Global sync (slower to propagate; use when ready)
-            cmds = await bot.tree.sync()
-            print(f"🌍 Synced {len(cmds)} global commands")
-        bot._synced_once = True
-
-# Admin-only resync command (safe)
-@bot.tree.command(name="sync", description="Force-resync slash commands here.")
-@app_commands.checks.has_permissions(administrator=True)
-async def sync_cmd(interaction: discord.Interaction):
-    if interaction.guild:
-        guild = discord.Object(id=interaction.guild.id)
-        cmds = await bot.tree.sync(guild=guild)
-        await interaction.response.send_message(
-            f"✅ Synced {len(cmds)} commands to this guild.", ephemeral=True
-        )
-    else:
-        cmds = await bot.tree.sync()
-        await interaction.response.send_message(
-            f"✅ Synced {len(cmds)} global commands.", ephemeral=True
-        )
+            cmds = await bot.sync_commands(force=True)
+            await interaction.response.send_message(
+                f"✅ Synced {len(cmds)} global commands.", ephemeral=True
+            )
+
+    return bot
 
-bot.run(TOKEN)
+if __name__ == "__main__":
+    create_bot().run(TOKEN)
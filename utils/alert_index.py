@@ -0,0 +1,133 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+def alert_line(symbol, price, condition, target):
+    arrow = "📈" if condition == "above" else "📉"
+    return f"{arrow} Alert: `{symbol}` is now at ${price:.2f} ({condition} {target})"
+
+# Resident copy of the alerts table. Per symbol, "above" and "below" thresholds are kept
+# sorted so a price finds every triggered alert with one bisect instead of a full scan.
+class AlertIndex:
+    def __init__(self):
+        self._above = {}  # symbol -> ([targets], [alert ids]), ascending by target
+        self._below = {}
+        self._alerts = {}  # alert id -> (user_id, symbol, condition, target)
+        self._by_user = defaultdict(set)
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def __contains__(self, alert_id):
+        return alert_id in self._alerts
+
+    def _side(self, condition):
+        return self._above if condition == "above" else self._below
+
+    def add(self, alert_id, user_id, symbol, condition, target):
+        if alert_id in self._alerts:
+            return
+        targets, ids = self._side(condition).setdefault(symbol, ([], []))
+        i = bisect_right(targets, target)
+        targets.insert(i, target)
+        ids.insert(i, alert_id)
+        self._alerts[alert_id] = (user_id, symbol, condition, target)
+        self._by_user[user_id].add(alert_id)
+
+    def remove(self, alert_id):
+        alert = self._alerts.pop(alert_id, None)
+        if alert is None:
+            return None
+        user_id, symbol, condition, target = alert
+
+        side = self._side(condition)
+        targets, ids = side[symbol]
+        i = bisect_left(targets, target)
+        while ids[i] != alert_id:
+            i += 1
+        del targets[i]
+        del ids[i]
+        if not targets:
+            del side[symbol]
+
+        user_ids = self._by_user[user_id]
+        user_ids.discard(alert_id)
+        if not user_ids:
+            del self._by_user[user_id]
+        return alert
+
+    def get(self, alert_id):
+        return self._alerts.get(alert_id)
+
+    def user_alert_ids(self, user_id):
+        return list(self._by_user.get(user_id, ()))
+
+    def find(self, user_id, symbol, target):
+        return [
+            alert_id for alert_id in self._by_user.get(user_id, ())
+            if self._alerts[alert_id][1] == symbol and self._alerts[alert_id][3] == target
+        ]
+
+    def remove_user(self, user_id):
+        ids = self.user_alert_ids(user_id)
+        for alert_id in ids:
+            self.remove(alert_id)
+        return ids
+
+    def has_symbol(self, symbol):
+        return symbol in self._above or symbol in self._below
+
+    def symbols(self):
+        return list(self._above.keys() | self._below.keys())
+
+    def triggered(self, symbol, price):
+        # "above" fires when price > target, i.e. every target strictly below the price
+        fired = []
+        if symbol in self._above:
+            targets, ids = self._above[symbol]
+            fired.extend(ids[:bisect_left(targets, price)])
+        # "below" fires when price < target, i.e. every target strictly above the price
+        if symbol in self._below:
+            targets, ids = self._below[symbol]
+            fired.extend(ids[bisect_right(targets, price):])
+        return fired
+
+    def pop_triggered(self, prices):
+        # Fired alerts leave the index right away so the next price can't fire them twice
+        fired = []
+        for symbol, price in prices.items():
+            for alert_id in self.triggered(symbol, price):
+                fired.append((alert_id, self.remove(alert_id), price))
+        return fired
+
+    def nearest_distance(self, symbol, price):
+        # Relative gap between the price and the closest threshold that hasn't fired yet
+        gaps = []
+        if symbol in self._above:
+            targets, _ = self._above[symbol]
+            i = bisect_left(targets, price)
+            if i < len(targets):
+                gaps.append(targets[i] - price)
+        if symbol in self._below:
+            targets, _ = self._below[symbol]
+            i = bisect_right(targets, price)
+            if i > 0:
+                gaps.append(price - targets[i - 1])
+        if not gaps or price <= 0:
+            return None
+        return min(gaps) / price
+
+    @classmethod
+    def from_rows(cls, rows):
+        # Sort once per symbol instead of paying a list insert per row
+        index = cls()
+        grouped = defaultdict(list)
+        for alert_id, user_id, symbol, condition, target in rows:
+            index._alerts[alert_id] = (user_id, symbol, condition, target)
+            index._by_user[user_id].add(alert_id)
+            grouped[(condition == "above", symbol)].append((target, alert_id))
+
+        for (is_above, symbol), entries in grouped.items():
+            entries.sort()
+            side = index._above if is_above else index._below
+            side[symbol] = ([t for t, _ in entries], [i for _, i in entries])
+        return index
@@ -0,0 +1,44 @@
+import time
+
+# A claimed batch that hasn't been completed by then is assumed lost (bot restarted mid-send)
+CLAIM_TIMEOUT = 5 * 60.0
+
+# Hand-off between alert_worker.py and the bot. The worker appends one row per fired alert;
+# the bot claims a batch, sends the DMs, then deletes the delivered alerts together with
+# their outbox rows. Until then the alert stays in the outbox, which keeps the worker from
+# arming it again on its next resync.
+
+async def write(db, entries):
+    # entries: (alert_id, user_id, line)
+    now = time.time()
+    await db.executemany(
+        "INSERT INTO alert_outbox (alert_id, user_id, line, created_at) VALUES (?, ?, ?, ?)",
+        [(alert_id, user_id, line, now) for alert_id, user_id, line in entries]
+    )
+
+async def claim(db, limit=1000):
+    now = time.time()
+    async with db.transaction() as conn:
+        cursor = await conn.execute(
+            '''UPDATE alert_outbox SET claimed_at = ?
+               WHERE id IN (
+                   SELECT id FROM alert_outbox
+                   WHERE claimed_at IS NULL OR claimed_at < ?
+                   ORDER BY id LIMIT ?
+               )
+               RETURNING id, alert_id, user_id, line, created_at''',
+            (now, now - CLAIM_TIMEOUT, limit)
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+    return sorted(rows)
+
+async def complete(db, outbox_ids, delivered_alert_ids):
+    # Undelivered alerts stay in the alerts table and are re-armed by the worker's next resync
+    async with db.transaction() as conn:
+        await conn.executemany("DELETE FROM alerts WHERE id = ?", [(i,) for i in delivered_alert_ids])
+        await conn.executemany("DELETE FROM alert_outbox WHERE id = ?", [(i,) for i in outbox_ids])
+
+async def pending_alert_ids(db):
+    rows = await db.fetchall("SELECT alert_id FROM alert_outbox")
+    return {row[0] for row in rows}
@@ -0,0 +1,46 @@
+import time
+from utils.market_hours import is_market_open
+
+# Poll interval by how close the price sits to its nearest threshold (relative distance)
+POLL_TIERS = (
+    (0.01, 60.0),
+    (0.03, 5 * 60.0),
+    (0.10, 15 * 60.0),
+)
+FAR_POLL = 30 * 60.0
+RETRY_AFTER = 5 * 60.0  # price lookup failed
+
+# Decides which alert symbols are worth fetching on a given tick: closed markets are
+# skipped, and symbols near a threshold come due far more often than distant ones.
+class AlertScheduler:
+    def __init__(self):
+        self._next_due = {}
+
+    def due(self, symbols, now=None):
+        now = now or time.time()
+        active = set(symbols)
+        if len(self._next_due) > 2 * len(active):
+            self._next_due = {s: t for s, t in self._next_due.items() if s in active}
+        # New symbols have no entry yet, so they are due straight away
+        return [
+            symbol for symbol in active
+            if self._next_due.get(symbol, 0) <= now and is_market_open(symbol)
+        ]
+
+    def interval_for(self, distance):
+        if distance is None:
+            return FAR_POLL
+        for limit, interval in POLL_TIERS:
+            if distance < limit:
+                return interval
+        return FAR_POLL
+
+    def reschedule(self, symbol, price, index, now=None):
+        now = now or time.time()
+        if price is None:
+            self._next_due[symbol] = now + RETRY_AFTER
+            return
+        self._next_due[symbol] = now + self.interval_for(index.nearest_distance(symbol, price))
+
+    def forget(self, symbol):
+        self._next_due.pop(symbol, None)
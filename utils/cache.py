@@ -0,0 +1,159 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class _NotLoaded(Exception):
+    # A bulk load finished without returning this key
+    pass
+
+class _Abandoned(_NotLoaded):
+    # The caller loading this key was cancelled; whoever waited on it loads it instead
+    pass
+
+# In-process LRU cache with per-entry expiry; concurrent misses share one load
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> Future shared by concurrent misses
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            del self._data[key]
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+    async def get_or_fetch(self, key, loader, ttl=None):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        # Someone is already fetching this key: wait for their result instead of fetching again
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except _NotLoaded:
+                pass  # the bulk load that had it in flight came back without it; load it here
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved so lone failures don't warn
+            raise
+        except BaseException:
+            # Only the cancelled caller gets the CancelledError
+            future.set_exception(_Abandoned(key))
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        self.set(key, value, ttl)
+        future.set_result(value)
+        return value
+
+    async def get_or_fetch_many(self, keys, loader, ttl=None):
+        # Bulk get_or_fetch: keys someone is already fetching are awaited, the rest go to a
+        # single loader(missing_keys) call returning {key: value}. Keys the loader doesn't
+        # return are simply absent from the result.
+        found, waiting, missing = {}, {}, []
+        for key in dict.fromkeys(keys):
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                found[key] = value
+            elif key in self._inflight:
+                self.coalesced += 1
+                waiting[key] = self._inflight[key]
+            else:
+                missing.append(key)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in missing}
+            self._inflight.update(futures)
+            try:
+                loaded = await loader(missing)
+            except Exception as e:
+                for future in futures.values():
+                    future.set_exception(e)
+                    future.exception()
+                raise
+            except BaseException:
+                for key, future in futures.items():
+                    future.set_exception(_Abandoned(key))
+                    future.exception()
+                raise
+            finally:
+                for key in missing:
+                    self._inflight.pop(key, None)
+
+            for key, future in futures.items():
+                if key in loaded:
+                    self.set(key, loaded[key], ttl)
+                    found[key] = loaded[key]
+                    future.set_result(loaded[key])
+                else:
+                    future.set_exception(_NotLoaded(key))
+                    future.exception()
+
+        abandoned = []
+        for key, future in waiting.items():
+            try:
+                found[key] = await asyncio.shield(future)
+            except _Abandoned:
+                abandoned.append(key)
+            except Exception:
+                continue
+        if abandoned:
+            found.update(await self.get_or_fetch_many(abandoned, loader, ttl))
+        return found
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import date
+from utils.history import period_start
+
+CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR", "data/chart_cache")
+CHART_CACHE_MAX_BYTES = int(os.getenv("CHART_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+def freshness_bucket(period, now=None):
+    # Short windows move intraday, long ones effectively once a day
+    now = now or time.time()
+    start = period_start(period)
+    days = (date.today() - start).days if start else None
+    if days is None or days <= 7:
+        bucket = 15 * 60
+    elif days <= 93:
+        bucket = 3600
+    else:
+        bucket = 86400
+    return int(now // bucket)
+
+def chart_key(kind, symbols, period, **options):
+    payload = json.dumps(
+        [kind, sorted(symbols), period, options, freshness_bucket(period)],
+        sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# Rendered PNGs on disk, addressed by chart_key(). File mtimes double as LRU order:
+# a hit touches the file, and eviction drops the oldest until the size cap holds.
+class ChartCache:
+    def __init__(self, directory=CHART_CACHE_DIR, max_bytes=CHART_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _scan(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self._size is None:
+            self._size = sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key, png):
+        self._scan()
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, path)
+        self._size += len(png)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith(".png")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        self._size = sum(entry.stat().st_size for entry in entries)
+        target = self.max_bytes * 0.9  # leave headroom so we don't evict on every write
+        for entry in entries:
+            if self._size <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._size -= size
+            except FileNotFoundError:
+                continue
+
+    async def get(self, key):
+        data = await asyncio.to_thread(self._read, key)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    async def put(self, key, png):
+        try:
+            await asyncio.to_thread(self._write, key, png)
+        except OSError as e:
+            print(f"Could not cache chart: {e}")
+
+chart_cache = ChartCache()
@@ -0,0 +1,126 @@
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Rendering is CPU-bound, so it runs in worker processes instead of on the event loop
+# Each worker re-imports main.py and matplotlib, and on a container cpu_count() is the host's
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", str(min(os.cpu_count() or 1, 2))))
+CHART_QUEUE_LIMIT = int(os.getenv("CHART_QUEUE_LIMIT", "16"))
+
+class ChartQueueFull(Exception):
+    pass
+
+_executor = None
+_pending = 0
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+def _warmup():
+    # Pays the matplotlib import and font cache cost before the first real request
+    render_line_chart([("warmup", [0, 1], [0.0, 1.0])], "warmup", "", "")
+    return os.getpid()
+
+def render_line_chart(series, title, xlabel, ylabel, rotate_xticks=False):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    for label, dates, closes in series:
+        ax.plot(dates, closes, label=label)
+
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    if rotate_xticks:
+        ax.tick_params(axis="x", labelrotation=45)
+    ax.grid(True)
+    ax.legend()
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+def series_from_frame(label, frame):
+    # Plain lists pickle far cheaper than DataFrames across the process boundary
+    return label, list(frame.index.to_pydatetime()), [float(v) for v in frame["Close"]]
+
+def normalize_series(series):
+    # Align every series on the union of their trading days (carrying the last close over
+    # another exchange's holidays), then rebase to 100 on the first day all of them have data
+    import numpy as np
+
+    if not series:
+        return []
+    day_arrays = [np.array(dates, dtype="datetime64[D]") for _, dates, _ in series]
+    days = np.unique(np.concatenate(day_arrays))
+
+    matrix = np.full((len(series), len(days)), np.nan)
+    for row, (day_array, (_, _, closes)) in enumerate(zip(day_arrays, series)):
+        matrix[row, np.searchsorted(days, day_array)] = closes
+
+    cols = np.arange(len(days))
+    last_seen = np.where(np.isnan(matrix), 0, cols)
+    np.maximum.accumulate(last_seen, axis=1, out=last_seen)
+    matrix = matrix[np.arange(len(series))[:, None], last_seen]
+
+    complete = np.flatnonzero(~np.isnan(matrix).any(axis=0))
+    if not len(complete):
+        return []
+    start = complete[0]
+    rebased = matrix[:, start:] / matrix[:, start:start + 1] * 100.0
+
+    dates = list(days[start:].astype("datetime64[s]").astype(object))
+    return [(label, dates, rebased[row].tolist()) for row, (label, _, _) in enumerate(series)]
+
+def start():
+    global _executor
+    if _executor is not None:
+        return
+    _executor = ProcessPoolExecutor(
+        max_workers=CHART_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker
+    )
+    for _ in range(CHART_WORKERS):
+        _executor.submit(_warmup)
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def render(series, title, xlabel="Date", ylabel="Close Price", rotate_xticks=False):
+    global _pending
+    if _pending >= CHART_QUEUE_LIMIT:
+        raise ChartQueueFull()
+
+    start()
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        executor = _executor
+        try:
+            return await loop.run_in_executor(
+                executor, render_line_chart, series, title, xlabel, ylabel, rotate_xticks
+            )
+        except BrokenProcessPool:
+            # A worker died (OOM, killed) and the pool is unusable from then on: replace it,
+            # unless another render already did, and retry once
+            if _executor is executor:
+                print("⚠️ Chart worker pool broke; restarting it")
+                shutdown()
+                start()
+            return await loop.run_in_executor(
+                _executor, render_line_chart, series, title, xlabel, ylabel, rotate_xticks
+            )
+    finally:
+        _pending -= 1
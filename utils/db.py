@@ -0,0 +1,115 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+import aiosqlite
+from utils.metrics import db_seconds
+
+DB_PATH = os.getenv("DB_PATH", "data/finance.db")
+READ_CONNECTIONS = int(os.getenv("DB_READ_CONNECTIONS", "2"))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+)
+
+# Long-lived connections shared by the whole bot: one writer, a few readers.
+# WAL lets the readers run while the writer commits.
+class Database:
+    def __init__(self, path=DB_PATH, readers=READ_CONNECTIONS):
+        self.path = path
+        self.reader_count = max(1, readers)
+        self._writer = None
+        self._readers = []
+        self._next_reader = 0
+        self._write_lock = asyncio.Lock()
+
+    async def _open(self):
+        conn = await aiosqlite.connect(self.path)
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        return conn
+
+    async def connect(self):
+        if self._writer is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = await self._open()
+        self._readers = [await self._open() for _ in range(self.reader_count)]
+
+    async def close(self):
+        for conn in [self._writer, *self._readers]:
+            if conn is not None:
+                await conn.close()
+        self._writer = None
+        self._readers = []
+
+    def _reader(self):
+        conn = self._readers[self._next_reader]
+        self._next_reader = (self._next_reader + 1) % len(self._readers)
+        return conn
+
+    async def fetchone(self, sql, params=()):
+        with db_seconds.time(op="fetchone"):
+            cursor = await self._reader().execute(sql, params)
+            try:
+                return await cursor.fetchone()
+            finally:
+                await cursor.close()
+
+    async def fetchall(self, sql, params=()):
+        with db_seconds.time(op="fetchall"):
+            cursor = await self._reader().execute(sql, params)
+            try:
+                return await cursor.fetchall()
+            finally:
+                await cursor.close()
+
+    async def iterate(self, sql, params=(), batch_size=500):
+        # Streams a large result in batches instead of materialising it with fetchall()
+        cursor = await self._reader().execute(sql, params)
+        try:
+            while rows := await cursor.fetchmany(batch_size):
+                for row in rows:
+                    yield row
+        finally:
+            await cursor.close()
+
+    async def execute(self, sql, params=()):
+        async with self._write_lock, db_seconds.time(op="execute"):
+            cursor = await self._writer.execute(sql, params)
+            await self._writer.commit()
+            rowcount = cursor.rowcount
+            await cursor.close()
+            return rowcount
+
+    async def insert(self, sql, params=()):
+        async with self._write_lock, db_seconds.time(op="insert"):
+            cursor = await self._writer.execute(sql, params)
+            await self._writer.commit()
+            row_id = cursor.lastrowid
+            await cursor.close()
+            return row_id
+
+    async def executemany(self, sql, rows):
+        # One commit for the whole batch instead of one per row
+        async with self._write_lock, db_seconds.time(op="executemany"):
+            cursor = await self._writer.executemany(sql, rows)
+            await self._writer.commit()
+            rowcount = cursor.rowcount
+            await cursor.close()
+            return rowcount
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self._write_lock, db_seconds.time(op="transaction"):
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            await self._writer.commit()
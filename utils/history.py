@@ -0,0 +1,198 @@
+import asyncio
+import re
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from utils import market
+
+# Re-check the trailing days at most this often; today's bar keeps moving until the close
+REFRESH_AFTER = 15 * 60.0
+# Closes are split/dividend adjusted, so a split or payout rewrites every earlier bar. When the
+# re-downloaded overlap day moved by more than this, the stored window is fetched again whole.
+ADJUSTED_TOLERANCE = 0.001
+
+_PERIOD = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+def _months_before(day, months):
+    month_index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(month_index, 12)
+    for d in (day.day, 30, 29, 28):
+        try:
+            return date(year, month + 1, d)
+        except ValueError:
+            continue
+
+def period_start(period, today=None):
+    today = today or date.today()
+    if period == "ytd":
+        return date(today.year, 1, 1)
+    match = _PERIOD.match(period)
+    if not match:
+        return None
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return today - timedelta(days=n)
+    if unit == "wk":
+        return today - timedelta(weeks=n)
+    if unit == "mo":
+        return _months_before(today, n)
+    return _months_before(today, n * 12)
+
+def _rows_from_frame(symbol, frame):
+    import pandas as pd
+
+    rows = []
+    for ts, bar in zip(frame.index, frame.itertuples(index=False)):
+        bar = bar._asdict()
+        close = bar.get("Close")
+        if close is None or pd.isna(close):
+            continue
+        volume = bar.get("Volume")
+        rows.append((
+            symbol, ts.date().isoformat(),
+            bar.get("Open"), bar.get("High"), bar.get("Low"), float(close),
+            int(volume) if volume is not None and not pd.isna(volume) else None
+        ))
+    return rows
+
+def _moved(frame, anchor):
+    # Whether the frame's close on the anchor day differs from the stored one
+    day, stored = anchor
+    closes = frame["Close"]
+    matches = closes[closes.index.strftime("%Y-%m-%d") == day].dropna()
+    if matches.empty or not stored:
+        return False
+    return abs(float(matches.iloc[0]) / stored - 1) > ADJUSTED_TOLERANCE
+
+def _frame_from_rows(rows):
+    import pandas as pd
+
+    index = pd.DatetimeIndex([pd.Timestamp(day) for day, _ in rows])
+    return pd.DataFrame({"Close": [close for _, close in rows]}, index=index)
+
+# Daily closes persisted in SQLite. A request only downloads what the table is missing:
+# the whole window the first time a symbol is seen (or a longer window is asked for),
+# otherwise just the trailing days since the last completed stored bar, which doubles as a
+# check that no split or dividend has re-adjusted the closes since.
+class HistoryStore:
+    def __init__(self, db):
+        self.db = db
+        self._locks = defaultdict(asyncio.Lock)
+
+    async def _plan(self, symbol, start):
+        # (fetch_from, covered_from, anchor) for a symbol that needs a download, None if the table
+        # is fresh. anchor is the (day, close) a trailing download must reproduce, or None.
+        coverage = await self.db.fetchone(
+            "SELECT covered_from, fetched_at FROM history_coverage WHERE symbol = ?", (symbol,)
+        )
+        if coverage and coverage[0] <= start.isoformat():
+            if time.time() - coverage[1] < REFRESH_AFTER:
+                return None
+            # Today's bar is still moving, so the anchor is the last completed day
+            last = await self.db.fetchone(
+                "SELECT day, close FROM price_history WHERE symbol = ? AND day < ? ORDER BY day DESC LIMIT 1",
+                (symbol, date.today().isoformat())
+            )
+            if last:
+                return date.fromisoformat(last[0]), coverage[0], (last[0], last[1])
+            return start, coverage[0], None
+        return start, start.isoformat(), None
+
+    async def _sync(self, symbols, start):
+        plans = {}
+        for symbol in symbols:
+            plan = await self._plan(symbol, start)
+            if plan:
+                plans[symbol] = plan
+        if not plans:
+            return
+
+        # Symbols that need the same window share one multi-ticker download
+        groups = defaultdict(list)
+        for symbol, (fetch_from, _, _) in plans.items():
+            groups[fetch_from].append(symbol)
+        results = await asyncio.gather(
+            *(market.fetch_daily_since_many(group, fetch_from) for fetch_from, group in groups.items())
+        )
+        fetched = {symbol: frame for frames in results for symbol, frame in frames.items()}
+
+        # A trailing download whose overlap day no longer matches means the history was
+        # re-adjusted: replace the whole stored window instead of appending to stale closes
+        readjusted = defaultdict(list)
+        for symbol, frame in fetched.items():
+            anchor = plans[symbol][2]
+            if anchor and _moved(frame, anchor):
+                readjusted[plans[symbol][1]].append(symbol)
+        stale = [symbol for group in readjusted.values() for symbol in group]
+        if stale:
+            print(f"📉 Re-adjusted history for {', '.join(sorted(stale))}; refetching")
+            results = await asyncio.gather(
+                *(market.fetch_daily_since_many(group, date.fromisoformat(covered_from))
+                  for covered_from, group in readjusted.items())
+            )
+            for symbol in stale:
+                del fetched[symbol]
+            fetched.update({symbol: frame for frames in results for symbol, frame in frames.items()})
+
+        rows, coverage = [], []
+        now = time.time()
+        # Symbols missing here failed or don't exist; leave their coverage alone so they retry
+        for symbol, frame in fetched.items():
+            rows.extend(_rows_from_frame(symbol, frame))
+            coverage.append((symbol, plans[symbol][1], now))
+
+        async with self.db.transaction() as conn:
+            # Re-adjusted symbols start over; one whose refetch failed keeps its old bars for now
+            # and, without a coverage row, gets its full window downloaded on the next request
+            await conn.executemany(
+                "DELETE FROM price_history WHERE symbol = ?", [(s,) for s in stale if s in fetched]
+            )
+            await conn.executemany(
+                "DELETE FROM history_coverage WHERE symbol = ?", [(s,) for s in stale if s not in fetched]
+            )
+            await conn.executemany(
+                "INSERT OR REPLACE INTO price_history (symbol, day, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            await conn.executemany(
+                "INSERT OR REPLACE INTO history_coverage (symbol, covered_from, fetched_at) VALUES (?, ?, ?)",
+                coverage
+            )
+
+    async def get_many(self, symbols, period):
+        symbols = list(dict.fromkeys(symbols))
+        start = period_start(period)
+        if start is None:
+            # "max" and odd periods have no fixed window to store against
+            frames = await asyncio.gather(
+                *(market.get_history(symbol, period=period) for symbol in symbols), return_exceptions=True
+            )
+            return {
+                symbol: frame for symbol, frame in zip(symbols, frames)
+                if not isinstance(frame, BaseException) and not frame.empty
+            }
+
+        # Sorted acquisition so overlapping requests can't deadlock each other
+        locks = [self._locks[symbol] for symbol in sorted(symbols)]
+        for lock in locks:
+            await lock.acquire()
+        try:
+            await self._sync(symbols, start)
+        finally:
+            for lock in locks:
+                lock.release()
+
+        frames = {}
+        for symbol in symbols:
+            rows = await self.db.fetchall(
+                "SELECT day, close FROM price_history WHERE symbol = ? AND day >= ? ORDER BY day",
+                (symbol, start.isoformat())
+            )
+            if rows:
+                frames[symbol] = _frame_from_rows(rows)
+        return frames
+
+    async def get(self, symbol, period):
+        frames = await self.get_many([symbol], period)
+        return frames.get(symbol, _frame_from_rows([]))
@@ -0,0 +1,139 @@
+import asyncio
+import importlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from utils.cache import TTLCache
+from utils.metrics import market_seconds, market_calls
+
+# Max tickers per bulk download; Yahoo gets flaky with very long symbol lists
+PRICE_BATCH_SIZE = 100
+
+# Short windows are live quotes, longer ones are chart history that barely moves
+QUOTE_TTL = 60.0
+HISTORY_TTL = 15 * 60.0
+QUOTE_PERIODS = {"1d", "2d", "5d"}
+
+# yfinance is blocking, so every call runs on this pool and never on the event loop
+MAX_WORKERS = int(os.getenv("MARKET_WORKERS", "8"))
+FETCH_TIMEOUT = float(os.getenv("MARKET_FETCH_TIMEOUT", "15"))
+BULK_TIMEOUT = float(os.getenv("MARKET_BULK_TIMEOUT", "60"))
+
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", "2048"))
+
+quote_cache = TTLCache(maxsize=QUOTE_CACHE_SIZE, ttl=QUOTE_TTL)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="market")
+# Callers queue here rather than in the executor, so the timeout only covers the fetch itself
+_fetch_slots = asyncio.Semaphore(MAX_WORKERS)
+
+async def run_blocking(func, *args, timeout=FETCH_TIMEOUT):
+    call = func.__name__.lstrip("_")
+    async with _fetch_slots:
+        loop = asyncio.get_running_loop()
+        status = "ok"
+        try:
+            with market_seconds.time(call=call):
+                return await asyncio.wait_for(loop.run_in_executor(_executor, func, *args), timeout)
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            market_calls.inc(call=call, status=status)
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+def _yf():
+    # yfinance drags in pandas (~1s); import on first use, or ahead of time via warm_up()
+    return importlib.import_module("yfinance")
+
+async def warm_up():
+    await run_blocking(_yf, timeout=None)
+
+def _ttl_for(period, interval):
+    if period in QUOTE_PERIODS or not interval.endswith("d"):
+        return QUOTE_TTL
+    return HISTORY_TTL
+
+def _fetch_history(symbol, period, interval):
+    return _yf().Ticker(symbol).history(period=period, interval=interval)
+
+def _lookup_isin(isin):
+    return _yf().utils.get_ticker_by_isin(isin) or None
+
+def _download_batch(batch, period, interval, start=None):
+    frames = {}
+    window = {"start": start} if start else {"period": period}
+    data = _yf().download(
+        batch, interval=interval, group_by="ticker",
+        auto_adjust=True, threads=True, progress=False, timeout=FETCH_TIMEOUT, **window
+    )
+    if data is None or data.empty:
+        return frames
+
+    for symbol in batch:
+        # A symbol that failed inside the batch just comes back as an all-NaN column
+        try:
+            frame = data[symbol] if data.columns.nlevels > 1 else data
+            frame = frame.dropna(subset=["Close"])
+            if not frame.empty:
+                frames[symbol] = frame
+        except Exception:
+            continue
+    return frames
+
+async def get_history(symbol, period="1d", interval="1d"):
+    key = (symbol, period, interval)
+
+    async def load():
+        return await run_blocking(_fetch_history, symbol, period, interval)
+
+    return await quote_cache.get_or_fetch(key, load, ttl=_ttl_for(period, interval))
+
+async def _download_many(symbols, period, interval, start=None):
+    # One multi-ticker download per batch; a failed batch just leaves its symbols out
+    batches = [symbols[i:i + PRICE_BATCH_SIZE] for i in range(0, len(symbols), PRICE_BATCH_SIZE)]
+    results = await asyncio.gather(
+        *(run_blocking(_download_batch, batch, period, interval, start, timeout=BULK_TIMEOUT) for batch in batches),
+        return_exceptions=True
+    )
+    frames = {}
+    for result in results:
+        if not isinstance(result, BaseException):
+            frames.update(result)
+    return frames
+
+async def get_history_many(symbols, period="1d", interval="1d"):
+    # Symbols another caller is already downloading are awaited rather than fetched again
+    async def load(keys):
+        frames = await _download_many([symbol for symbol, _, _ in keys], period, interval)
+        return {(symbol, period, interval): frame for symbol, frame in frames.items()}
+
+    found = await quote_cache.get_or_fetch_many(
+        [(symbol, period, interval) for symbol in symbols], load, ttl=_ttl_for(period, interval)
+    )
+    return {symbol: frame for (symbol, _, _), frame in found.items()}
+
+async def fetch_history_many(symbols, period="1d", interval="1d"):
+    # Uncached bulk download for callers that keep the result themselves (the price snapshot),
+    # so a refresh of every watched symbol doesn't push the live quotes out of quote_cache
+    return await _download_many(symbols, period, interval)
+
+async def get_latest_prices(symbols):
+    frames = await get_history_many(symbols, period="1d")
+    prices = {}
+    for symbol, frame in frames.items():
+        if not frame.empty:
+            prices[symbol] = float(frame["Close"].iloc[-1])
+    return prices
+
+async def fetch_daily_since_many(symbols, start):
+    # Uncached on purpose: utils.history persists the result itself.
+    # One multi-ticker download per batch instead of a request per symbol.
+    return await _download_many(symbols, None, "1d", start.isoformat())
+
+async def lookup_isin(isin):
+    return await run_blocking(_lookup_isin, isin)
@@ -0,0 +1,56 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+# Regular trading sessions by Yahoo symbol suffix; no suffix means a US listing.
+# Holidays aren't modelled — a poll on a holiday just returns the last close.
+SESSIONS = {
+    "": ("America/New_York", time(9, 30), time(16, 0)),
+    ".DE": ("Europe/Berlin", time(9, 0), time(17, 30)),
+    ".F": ("Europe/Berlin", time(8, 0), time(22, 0)),
+    ".L": ("Europe/London", time(8, 0), time(16, 30)),
+    ".PA": ("Europe/Paris", time(9, 0), time(17, 30)),
+    ".AS": ("Europe/Amsterdam", time(9, 0), time(17, 30)),
+    ".BR": ("Europe/Brussels", time(9, 0), time(17, 30)),
+    ".MI": ("Europe/Rome", time(9, 0), time(17, 30)),
+    ".MC": ("Europe/Madrid", time(9, 0), time(17, 30)),
+    ".SW": ("Europe/Zurich", time(9, 0), time(17, 30)),
+    ".VI": ("Europe/Vienna", time(9, 0), time(17, 30)),
+    ".TO": ("America/Toronto", time(9, 30), time(16, 0)),
+    ".T": ("Asia/Tokyo", time(9, 0), time(15, 30)),
+    ".HK": ("Asia/Hong_Kong", time(9, 30), time(16, 0)),
+    ".AX": ("Australia/Sydney", time(10, 0), time(16, 0)),
+}
+
+INDEX_SUFFIXES = {"^GDAXI": ".DE", "^FTSE": ".L", "^FCHI": ".PA", "^N225": ".T", "^HSI": ".HK"}
+
+CRYPTO_QUOTES = {"USD", "EUR", "GBP", "USDT"}
+
+# Yahoo quotes lag ~15 minutes, so keep polling a little past the close to catch the final print
+CLOSE_GRACE = timedelta(minutes=20)
+
+def session_for(symbol):
+    if symbol in INDEX_SUFFIXES:
+        return SESSIONS[INDEX_SUFFIXES[symbol]]
+    if "." in symbol:
+        return SESSIONS.get("." + symbol.rsplit(".", 1)[1])
+    return SESSIONS[""]
+
+def is_market_open(symbol, now=None):
+    now = now or datetime.now(ZoneInfo("UTC"))
+
+    # Crypto (BTC-USD) trades around the clock, FX and futures (EURUSD=X, GC=F) around the weekday clock
+    if "-" in symbol and "." not in symbol and symbol.rsplit("-", 1)[1] in CRYPTO_QUOTES:
+        return True
+    if symbol.endswith("=X") or symbol.endswith("=F"):
+        return now.weekday() < 5
+
+    session = session_for(symbol)
+    if session is None:
+        return True  # unknown exchange: don't risk missing an alert
+    tz, open_at, close_at = session
+    local = now.astimezone(ZoneInfo(tz))
+    if local.weekday() >= 5:
+        return False
+    opens = local.replace(hour=open_at.hour, minute=open_at.minute, second=0, microsecond=0)
+    closes = local.replace(hour=close_at.hour, minute=close_at.minute, second=0, microsecond=0)
+    return opens <= local <= closes + CLOSE_GRACE
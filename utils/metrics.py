@@ -0,0 +1,195 @@
+import asyncio
+import os
+import time
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def total(self, **labels):
+        wanted = set(_label_key(labels))
+        return sum(v for key, v in self.values.items() if wanted <= set(key))
+
+    def render(self):
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.series = {}  # label key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def count(self, key):
+        return sum(self.series[key][:-1])
+
+    def quantile(self, q, key):
+        # Estimated from the buckets, the same way Prometheus' histogram_quantile does
+        series = self.series.get(key)
+        if not series:
+            return None
+        counts = series[:-1]
+        rank = q * sum(counts)
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # +Inf bucket: best we can say is "above the top bound"
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def render(self):
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                yield f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            yield f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(key)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(key)} {cumulative}"
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+    # Usable in "async with" too, alongside locks
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.gauges = {}  # name -> (help, callback returning {label dict tuple: value})
+
+    def counter(self, name, help):
+        return self.metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def gauge(self, name, help, callback):
+        # Sampled at scrape time, for values that already live somewhere else (cache stats etc.)
+        self.gauges[name] = (help, callback)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for name, (help, callback) in self.gauges.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            try:
+                for labels, value in callback().items():
+                    lines.append(f"{name}{_format_labels(_label_key(dict(labels)))} {value}")
+            except Exception as e:
+                print(f"Metrics gauge {name} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+command_seconds = registry.histogram("financepal_command_seconds", "Slash command latency")
+commands_total = registry.counter("financepal_commands_total", "Slash commands handled, by outcome")
+market_seconds = registry.histogram("financepal_market_fetch_seconds", "yfinance call latency")
+market_calls = registry.counter("financepal_market_calls_total", "yfinance calls, by outcome")
+db_seconds = registry.histogram(
+    "financepal_db_query_seconds", "SQLite query latency",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+alert_cycle_seconds = registry.histogram("financepal_alert_cycle_seconds", "Alert evaluation cycle duration")
+alerts_fired = registry.counter("financepal_alerts_fired_total", "Alerts that crossed their threshold")
+alert_delivery_seconds = registry.histogram(
+    "financepal_alert_delivery_seconds", "Time from an alert worker firing an alert to its DM going out",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+
+def observe_command(interaction, status):
+    # started_at is stamped by the command tree's interaction_check
+    started_at = interaction.extras.get("started_at")
+    command = interaction.command.qualified_name if interaction.command else "unknown"
+    commands_total.inc(command=command, status=status)
+    if started_at is not None:
+        command_seconds.observe(time.perf_counter() - started_at, command=command)
+
+async def _handle_scrape(reader, writer):
+    try:
+        await reader.readuntil(b"\r\n\r\n")
+        body = registry.render().encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            + f"Content-Length: {len(body)}\r\n".encode()
+            + b"Connection: close\r\n\r\n" + body
+        )
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(port, host="127.0.0.1"):
+    # Bare-bones /metrics endpoint; every path returns the exposition text
+    return await asyncio.start_server(_handle_scrape, host, port)
+
+async def write_periodically(path, interval=15.0):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            text = registry.render()
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Could not write metrics file: {e}")
@@ -0,0 +1,131 @@
+# Schema history, applied in order at startup. The current version lives in PRAGMA user_version,
+# so never edit a shipped migration — append a new one instead.
+MIGRATIONS = [
+    # 1: the original tables, as the cogs used to create them
+    [
+        '''CREATE TABLE IF NOT EXISTS seen_users (
+            user_id TEXT PRIMARY KEY
+        )''',
+        '''CREATE TABLE IF NOT EXISTS watchlists (
+            user_id TEXT,
+            symbol TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS alerts (
+            user_id TEXT,
+            symbol TEXT,
+            condition TEXT,
+            target REAL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS user_settings (
+            user_id TEXT PRIMARY KEY,
+            currency TEXT DEFAULT 'USD',
+            chart_days INTEGER DEFAULT 30,
+            show_percentages INTEGER DEFAULT 1,
+            watchlist_limit INTEGER DEFAULT 10
+        )''',
+    ],
+    # 2: keys and indexes; drops duplicate watchlist rows on the way
+    [
+        '''CREATE TABLE watchlists_new (
+            user_id TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            UNIQUE (user_id, symbol)
+        )''',
+        "INSERT OR IGNORE INTO watchlists_new (user_id, symbol) SELECT user_id, symbol FROM watchlists",
+        "DROP TABLE watchlists",
+        "ALTER TABLE watchlists_new RENAME TO watchlists",
+        "CREATE INDEX idx_watchlists_symbol ON watchlists (symbol)",
+        '''CREATE TABLE alerts_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            condition TEXT NOT NULL,
+            target REAL NOT NULL
+        )''',
+        "INSERT INTO alerts_new (user_id, symbol, condition, target) SELECT user_id, symbol, condition, target FROM alerts",
+        "DROP TABLE alerts",
+        "ALTER TABLE alerts_new RENAME TO alerts",
+        "CREATE INDEX idx_alerts_user_id ON alerts (user_id)",
+        "CREATE INDEX idx_alerts_symbol ON alerts (symbol)",
+    ],
+    # 3: local daily price history, filled incrementally by utils.history
+    [
+        '''CREATE TABLE price_history (
+            symbol TEXT NOT NULL,
+            day TEXT NOT NULL,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL NOT NULL,
+            volume INTEGER,
+            PRIMARY KEY (symbol, day)
+        ) WITHOUT ROWID''',
+        '''CREATE TABLE history_coverage (
+            symbol TEXT PRIMARY KEY,
+            covered_from TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        )''',
+    ],
+    # 4: cached ticker validation (symbol NULL = known bad) and ISIN lookups
+    [
+        '''CREATE TABLE ticker_validation (
+            query TEXT PRIMARY KEY,
+            symbol TEXT,
+            checked_at REAL NOT NULL
+        )''',
+        '''CREATE TABLE isin_map (
+            isin TEXT PRIMARY KEY,
+            symbol TEXT NOT NULL
+        )''',
+    ],
+    # 5: small key/value store for bot bookkeeping (e.g. the last synced command fingerprint)
+    [
+        '''CREATE TABLE bot_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )''',
+    ],
+    # 6: fired alerts handed from alert_worker.py to the bot, which sends the DMs
+    [
+        '''CREATE TABLE alert_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            alert_id INTEGER NOT NULL,
+            user_id TEXT NOT NULL,
+            line TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            claimed_at REAL
+        )''',
+        "CREATE INDEX idx_alert_outbox_alert_id ON alert_outbox (alert_id)",
+    ],
+    # 7: last price and day change for every watchlisted symbol, kept fresh by utils.price_snapshot
+    [
+        '''CREATE TABLE price_snapshot (
+            symbol TEXT PRIMARY KEY,
+            price REAL NOT NULL,
+            change_pct REAL,
+            updated_at REAL NOT NULL
+        )''',
+    ],
+]
+
+async def migrate(db):
+    row = await db.fetchone("PRAGMA user_version")
+    current = row[0] if row else 0
+
+    for version, statements in enumerate(MIGRATIONS, start=1):
+        if version <= current:
+            continue
+        # Each migration is all-or-nothing, so a crash mid-upgrade leaves the old schema intact.
+        # IMMEDIATE takes the write lock up front; another process migrating at the same time
+        # waits here and then finds the step already applied.
+        async with db.transaction() as conn:
+            await conn.execute("BEGIN IMMEDIATE")
+            cursor = await conn.execute("PRAGMA user_version")
+            (applied,) = await cursor.fetchone()
+            await cursor.close()
+            if applied >= version:
+                continue
+            for statement in statements:
+                await conn.execute(statement)
+            await conn.execute(f"PRAGMA user_version = {version}")
+        print(f"🗃️ Database migrated to schema v{version}")
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+import discord
+
+DM_CONCURRENCY = int(os.getenv("DM_CONCURRENCY", "10"))
+DM_PER_SECOND = float(os.getenv("DM_PER_SECOND", "20"))  # stays well under Discord's global 50 req/s
+MESSAGE_LIMIT = 2000
+
+class RateLimiter:
+    # Token bucket; acquire() waits until a request may go out
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+def _chunks(lines, limit=MESSAGE_LIMIT):
+    chunk = ""
+    for line in lines:
+        if chunk and len(chunk) + len(line) + 1 > limit:
+            yield chunk
+            chunk = ""
+        chunk = f"{chunk}\n{line}" if chunk else line[:limit]
+    if chunk:
+        yield chunk
+
+# Queue of outgoing DMs drained by a few workers. Callers submit one job per user
+# (already merged) and get back a future that resolves to whether it was delivered.
+class NotificationDispatcher:
+    def __init__(self, bot, concurrency=DM_CONCURRENCY, per_second=DM_PER_SECOND):
+        self.bot = bot
+        self.concurrency = concurrency
+        self._limiter = RateLimiter(per_second)
+        self._queue = asyncio.Queue()
+        self._workers = []
+        self.sent = 0
+        self.failed = 0
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    def submit(self, user_id, lines):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((int(user_id), list(lines), future))
+        return future
+
+    async def _resolve(self, user_id):
+        # Cached users cost nothing; only unknown ones hit the REST API
+        user = self.bot.get_user(user_id)
+        if user is None:
+            await self._limiter.acquire()
+            user = await self.bot.fetch_user(user_id)
+        return user
+
+    async def _deliver(self, user_id, lines):
+        user = await self._resolve(user_id)
+        for chunk in _chunks(lines):
+            await self._limiter.acquire()
+            await user.send(chunk)
+
+    async def _worker(self):
+        while True:
+            user_id, lines, future = await self._queue.get()
+            delivered = False
+            try:
+                await self._deliver(user_id, lines)
+                delivered = True
+                self.sent += 1
+            except discord.Forbidden:
+                self.failed += 1  # User has DMs closed
+            except Exception as e:
+                self.failed += 1
+                print(f"Failed to DM user {user_id}: {e}")
+            finally:
+                self._queue.task_done()
+                if not future.done():
+                    future.set_result(delivered)
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import time
+from utils import market
+
+PRICE_FEED = os.getenv("PRICE_FEED", "poll")  # "poll" or "stream"
+PRICE_FEED_ADDR = os.getenv("PRICE_FEED_ADDR", "127.0.0.1:8765")  # host:port of the streaming feed
+
+# A symbol whose last tick is older than this goes back to being polled
+STALE_AFTER = float(os.getenv("PRICE_FEED_STALE_AFTER", "300"))
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 60.0
+
+# Where alert prices come from. The alerts cog hands a source the symbols it cares about
+# and a callback taking {symbol: price}; whatever the source can't cover (stale() says
+# which) is polled through utils.market on the cog's own schedule.
+class PollingPriceSource:
+    name = "poll"
+
+    async def start(self, on_prices):
+        pass
+
+    async def close(self):
+        pass
+
+    def watch(self, symbols):
+        pass
+
+    def unwatch(self, symbols):
+        pass
+
+    def stale(self, symbols):
+        return list(symbols)
+
+    async def fetch(self, symbols):
+        return await market.get_latest_prices(symbols)
+
+# Keeps one TCP connection to a push feed speaking newline-delimited JSON:
+#   we send     {"subscribe": ["AAPL", ...]}  /  {"unsubscribe": [...]}
+#   it sends    {"symbol": "AAPL", "price": 187.25}
+# Every tick goes to the callback as it arrives, so alerts fire within a read of the
+# crossing instead of on the next poll. Reconnects with backoff and resubscribes.
+class StreamingPriceSource(PollingPriceSource):
+    name = "stream"
+
+    def __init__(self, host, port, stale_after=STALE_AFTER):
+        self.host = host
+        self.port = port
+        self.stale_after = stale_after
+        self._symbols = set()
+        self._last_tick = {}
+        self._writer = None
+        self._task = None
+        self._on_prices = None
+        self.ticks = 0
+
+    async def start(self, on_prices):
+        self._on_prices = on_prices
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    def _send(self, message):
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write(json.dumps(message).encode() + b"\n")
+
+    def watch(self, symbols):
+        new = set(symbols) - self._symbols
+        if new:
+            self._symbols |= new
+            self._send({"subscribe": sorted(new)})
+
+    def unwatch(self, symbols):
+        gone = set(symbols) & self._symbols
+        if gone:
+            self._symbols -= gone
+            for symbol in gone:
+                self._last_tick.pop(symbol, None)
+            self._send({"unsubscribe": sorted(gone)})
+
+    def stale(self, symbols):
+        cutoff = time.monotonic() - self.stale_after
+        return [symbol for symbol in symbols if self._last_tick.get(symbol, 0) < cutoff]
+
+    def _handle(self, line):
+        try:
+            message = json.loads(line)
+            symbol = message["symbol"]
+            price = float(message["price"])
+        except (ValueError, KeyError, TypeError):
+            return
+        if symbol not in self._symbols:
+            return
+        self._last_tick[symbol] = time.monotonic()
+        self.ticks += 1
+        self._on_prices({symbol: price})
+
+    async def _run(self):
+        delay = RECONNECT_MIN
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection(self.host, self.port)
+                print(f"📡 Price feed connected to {self.host}:{self.port}")
+                delay = RECONNECT_MIN
+                if self._symbols:
+                    self._send({"subscribe": sorted(self._symbols)})
+                while line := await reader.readline():
+                    self._handle(line)
+                print("📡 Price feed closed the connection")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"📡 Price feed error: {e}")
+            finally:
+                if self._writer:
+                    self._writer.close()
+                    self._writer = None
+            # Nothing is fresh while disconnected, so polling covers every symbol meanwhile
+            self._last_tick.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX)
+
+def from_env():
+    if PRICE_FEED == "stream":
+        host, _, port = PRICE_FEED_ADDR.rpartition(":")
+        return StreamingPriceSource(host or "127.0.0.1", int(port))
+    return PollingPriceSource()
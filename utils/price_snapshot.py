@@ -0,0 +1,75 @@
+import os
+import time
+from utils import market
+
+REFRESH_EVERY = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "300"))
+# Older entries are treated as missing and fetched on demand
+MAX_AGE = 60 * 60.0
+
+def quote_from_frame(frame):
+    # (last price, % change vs the previous close) from a daily history frame
+    closes = frame["Close"].dropna()
+    if closes.empty:
+        return None
+    price = float(closes.iloc[-1])
+    change = None
+    if len(closes) >= 2 and closes.iloc[-2]:
+        change = (price / float(closes.iloc[-2]) - 1) * 100
+    return price, change
+
+# Last price and day change for every symbol on anyone's watchlist. A background job refreshes
+# the whole set in bulk downloads; /list then reads it from memory instead of hitting Yahoo.
+# The table lets a restarted bot (or another shard's process) serve it straight away.
+class PriceSnapshot:
+    def __init__(self, db):
+        self.db = db
+        self._quotes = {}  # symbol -> (price, change_pct or None, updated_at)
+        self.refreshed_at = 0.0
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def get(self, symbol, max_age=MAX_AGE):
+        entry = self._quotes.get(symbol)
+        if entry is None or time.time() - entry[2] > max_age:
+            return None
+        return entry[0], entry[1]
+
+    async def load(self):
+        rows = await self.db.fetchall("SELECT symbol, price, change_pct, updated_at FROM price_snapshot")
+        self._quotes = {symbol: (price, change, updated_at) for symbol, price, change, updated_at in rows}
+
+    async def _store(self, frames):
+        now = time.time()
+        rows = []
+        for symbol, frame in frames.items():
+            quote = quote_from_frame(frame)
+            if quote is not None:
+                self._quotes[symbol] = (*quote, now)
+                rows.append((symbol, quote[0], quote[1], now))
+        if rows:
+            await self.db.executemany(
+                "INSERT OR REPLACE INTO price_snapshot (symbol, price, change_pct, updated_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    async def refresh(self):
+        rows = await self.db.fetchall("SELECT DISTINCT symbol FROM watchlists")
+        symbols = [row[0] for row in rows]
+        stored = await self._store(await market.fetch_history_many(symbols, period="2d")) if symbols else 0
+
+        # Symbols nobody watches any more
+        watched = set(symbols)
+        gone = [symbol for symbol in self._quotes if symbol not in watched]
+        for symbol in gone:
+            del self._quotes[symbol]
+        if gone:
+            await self.db.executemany("DELETE FROM price_snapshot WHERE symbol = ?", [(s,) for s in gone])
+        self.refreshed_at = time.time()
+        return stored
+
+    async def fetch(self, symbols):
+        # On-demand fill for symbols the last refresh didn't cover (e.g. just added)
+        await self._store(await market.get_history_many(symbols, period="2d"))
+        return {symbol: self.get(symbol) for symbol in symbols}
@@ -0,0 +1,85 @@
+import asyncio
+from array import array
+from bisect import bisect_left
+
+FLUSH_INTERVAL = 2.0
+FLUSH_BATCH_SIZE = 500
+
+# Who has already had the welcome DM. Users known at startup sit in a sorted 8-byte array
+# (millions of IDs stay in tens of MB); users seen since then go in a small set and are
+# written back to the database in batches by a background task.
+class SeenUsers:
+    def __init__(self, db):
+        self.db = db
+        self._loaded = array("Q")
+        self._recent = set()
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def __len__(self):
+        return len(self._loaded) + len(self._recent)
+
+    def __contains__(self, user_id):
+        user_id = int(user_id)
+        if user_id in self._recent:
+            return True
+        i = bisect_left(self._loaded, user_id)
+        return i < len(self._loaded) and self._loaded[i] == user_id
+
+    async def load(self):
+        rows = await self.db.fetchall("SELECT user_id FROM seen_users")
+        self._loaded = array("Q", sorted(int(row[0]) for row in rows))
+        self._recent.clear()
+
+    def mark(self, user_id):
+        # True only the first time a user is seen, so callers can greet exactly once
+        if user_id in self:
+            return False
+        self._recent.add(int(user_id))
+        self._queue.put_nowait(str(user_id))
+        return True
+
+    async def claim(self, user_id):
+        # Like mark(), but the insert itself decides, so bot processes sharing the table
+        # (sharded deployments) greet a user once between them
+        if user_id in self:
+            return False
+        self._recent.add(int(user_id))
+        added = await self.db.execute("INSERT OR IGNORE INTO seen_users (user_id) VALUES (?)", (str(user_id),))
+        return added > 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while await self._flush() == FLUSH_BATCH_SIZE:
+            pass
+
+    async def _flush(self):
+        batch = []
+        while not self._queue.empty() and len(batch) < FLUSH_BATCH_SIZE:
+            batch.append((self._queue.get_nowait(),))
+        if batch:
+            try:
+                await self.db.executemany("INSERT OR IGNORE INTO seen_users (user_id) VALUES (?)", batch)
+            except Exception:
+                for (user_id,) in batch:
+                    self._queue.put_nowait(user_id)  # retried on the next flush
+                raise
+        return len(batch)
+
+    async def _flush_loop(self):
+        while True:
+            # Block until there is something to write, then give the batch a moment to fill up
+            first = await self._queue.get()
+            self._queue.put_nowait(first)
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                while await self._flush() == FLUSH_BATCH_SIZE:
+                    pass
+            except Exception as e:
+                print(f"Failed to persist seen users: {e}")
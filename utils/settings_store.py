@@ -0,0 +1,45 @@
+from utils.cache import TTLCache
+
+DEFAULT_SETTINGS = {
+    "currency": "USD",
+    "chart_days": 30,
+    "show_percentages": 1,
+    "watchlist_limit": 10,
+}
+FIELDS = tuple(DEFAULT_SETTINGS)
+
+# Write-through cache of user_settings: reads are served from memory after the first
+# lookup (users without a row cache the defaults), and saves update both places.
+# Entries never expire unless given a ttl; set one when other processes save settings too.
+class SettingsStore:
+    def __init__(self, db, maxsize=50_000, ttl=0):
+        self.db = db
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, user_id):
+        settings = self._cache.get(user_id)
+        if settings is not None:
+            return settings
+
+        row = await self.db.fetchone(
+            f"SELECT {', '.join(FIELDS)} FROM user_settings WHERE user_id = ?", (user_id,)
+        )
+        settings = dict(zip(FIELDS, row)) if row else dict(DEFAULT_SETTINGS)
+        self._cache.set(user_id, settings)
+        return settings
+
+    async def save(self, user_id, field, value):
+        if field not in DEFAULT_SETTINGS:
+            raise ValueError(f"Unknown setting: {field}")
+        await self.db.execute(f'''
+            INSERT INTO user_settings (user_id, {field})
+            VALUES (?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET {field} = excluded.{field}
+        ''', (user_id, value))
+
+        settings = dict(await self.get(user_id))
+        settings[field] = value
+        self._cache.set(user_id, settings)
+
+    def stats(self):
+        return self._cache.stats()
@@ -0,0 +1,138 @@
+import asyncio
+import csv
+import os
+import re
+import sys
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+import discord
+from discord import app_commands
+
+# Drop in a bigger export (same symbol,name,exchange columns) to widen the universe
+SYMBOLS_PATH = os.getenv("SYMBOLS_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets", "symbols.csv"))
+MAX_CHOICES = 25  # Discord's cap on autocomplete results
+SCAN_LIMIT = 200  # prefix matches considered per index before ranking
+
+_WORD = re.compile(r"[A-Z0-9]+")
+
+_IndexData = namedtuple("_IndexData", "symbols names symbol_keys symbol_rows name_keys name_rows")
+
+# Prefix index over the symbol universe: parallel sorted key/row arrays searched with bisect.
+# Symbols are indexed with and without their exchange suffix, names word by word.
+# Built once (usually on a worker thread at startup) and published in a single assignment.
+class TickerIndex:
+    def __init__(self, path=SYMBOLS_PATH):
+        self.path = path
+        self._data = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.load().symbols)
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    def load(self):
+        data = self._data
+        if data is not None:
+            return data
+        with self._lock:
+            if self._data is None:
+                self._data = self._read()
+            return self._data
+
+    def _read(self):
+        symbols = []
+        names = []
+        symbol_entries = []
+        name_entries = []
+        try:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    symbol = row["symbol"].strip().upper()
+                    if not symbol:
+                        continue
+                    i = len(symbols)
+                    symbols.append(symbol)
+                    names.append(sys.intern(row.get("name", "").strip()))
+
+                    symbol_entries.append((symbol, i))
+                    base = symbol.split(".")[0].lstrip("^")
+                    if base != symbol:
+                        symbol_entries.append((base, i))
+                    for word in set(_WORD.findall(names[i].upper())):
+                        name_entries.append((word, i))
+        except FileNotFoundError:
+            print(f"⚠️ Symbol universe not found at {self.path}; autocomplete will be empty.")
+
+        symbol_entries.sort()
+        name_entries.sort()
+        return _IndexData(
+            symbols, names,
+            [k for k, _ in symbol_entries], [r for _, r in symbol_entries],
+            [k for k, _ in name_entries], [r for _, r in name_entries],
+        )
+
+    def _prefix_rows(self, keys, rows, prefix):
+        i = bisect_left(keys, prefix)
+        end = min(len(keys), i + SCAN_LIMIT)
+        while i < end and keys[i].startswith(prefix):
+            yield keys[i], rows[i]
+            i += 1
+
+    def search(self, query, limit=MAX_CHOICES):
+        data = self.load()
+        words = _WORD.findall(query.upper())
+        if not words:
+            # Nothing typed yet: offer the head of the file, which is ordered by popularity
+            return list(zip(data.symbols[:limit], data.names[:limit]))
+
+        # Rank: exact symbol, then symbol prefix (shorter first), then company-name word prefix
+        ranked = {}
+        query = query.strip().upper()
+        for key, row in self._prefix_rows(data.symbol_keys, data.symbol_rows, query):
+            score = (0 if key == query or data.symbols[row] == query else 1, len(data.symbols[row]))
+            if row not in ranked or score < ranked[row]:
+                ranked[row] = score
+
+        # Multi-word queries look up the first word and require the rest somewhere in the name
+        for _, row in self._prefix_rows(data.name_keys, data.name_rows, words[0]):
+            if row in ranked:
+                continue
+            name_words = _WORD.findall(data.names[row].upper())
+            if all(any(w.startswith(rest) for w in name_words) for rest in words[1:]):
+                ranked[row] = (2, len(data.symbols[row]))
+
+        best = sorted(ranked, key=lambda row: (ranked[row], data.symbols[row]))[:limit]
+        return [(data.symbols[row], data.names[row]) for row in best]
+
+ticker_index = TickerIndex()
+
+async def _ensure_loaded():
+    # Never build the index on the event loop; wait for (or do) the load on a thread
+    if not ticker_index.loaded:
+        await asyncio.to_thread(ticker_index.load)
+
+async def autocomplete_ticker(interaction: discord.Interaction, current: str):
+    await _ensure_loaded()
+    choices = []
+    for symbol, name in ticker_index.search(current):
+        label = f"{symbol} — {name}" if name else symbol
+        choices.append(app_commands.Choice(name=label[:100], value=symbol))
+    return choices
+
+async def autocomplete_ticker_list(interaction: discord.Interaction, current: str):
+    # For comma-separated inputs: complete the symbol being typed, keep the ones before it
+    await _ensure_loaded()
+    head, _, tail = current.rpartition(",")
+    prefix = f"{head.strip()}, " if head.strip() else ""
+    choices = []
+    for symbol, name in ticker_index.search(tail.strip()):
+        value = prefix + symbol
+        if len(value) > 100:
+            break
+        label = f"{value} — {name}" if name else value
+        choices.append(app_commands.Choice(name=label[:100], value=value))
+    return choices
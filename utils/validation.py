@@ -0,0 +1,142 @@
+import asyncio
+import time
+from utils import market
+
+# Good symbols stay valid for a long time; misses are re-checked soon in case of a typo-then-listing
+POSITIVE_TTL = 30 * 24 * 3600.0
+NEGATIVE_TTL = 3600.0
+
+class LookupFailed(Exception):
+    # The network check itself failed: the answer is "unknown", not "no such symbol"
+    pass
+
+def looks_like_isin(value):
+    return len(value) == 12 and value[:2].isalpha() and value[2:].isalnum() and value[-1].isdigit()
+
+# Answers "which Yahoo symbol does the user mean?" from SQLite whenever it can.
+# Only unknown (or expired) queries reach the network, and then the plain symbol and its
+# exchange-suffix fallbacks are checked concurrently instead of one after another.
+class TickerValidator:
+    FALLBACK_SUFFIXES = (".DE",)
+
+    def __init__(self, db):
+        self.db = db
+
+    async def _exists(self, symbol):
+        try:
+            hist = await market.get_history(symbol, period="1d")
+        except Exception as e:
+            raise LookupFailed(symbol) from e
+        return not hist.empty
+
+    async def _cached(self, query):
+        row = await self.db.fetchone(
+            "SELECT symbol, checked_at FROM ticker_validation WHERE query = ?", (query,)
+        )
+        if row is None:
+            return False, None
+        symbol, checked_at = row
+        ttl = POSITIVE_TTL if symbol else NEGATIVE_TTL
+        if time.time() - checked_at > ttl:
+            return False, None
+        return True, symbol
+
+    async def _remember(self, verdicts):
+        # verdicts: (query, symbol or None), written in one statement however many there are
+        now = time.time()
+        await self.db.executemany(
+            "INSERT OR REPLACE INTO ticker_validation (query, symbol, checked_at) VALUES (?, ?, ?)",
+            [(query, symbol, now) for query, symbol in verdicts]
+        )
+
+    async def resolve_isin(self, isin):
+        row = await self.db.fetchone("SELECT symbol FROM isin_map WHERE isin = ?", (isin,))
+        if row:
+            return row[0]
+        try:
+            symbol = await market.lookup_isin(isin)
+        except Exception as e:
+            raise LookupFailed(isin) from e
+        if symbol:
+            symbol = symbol.upper()
+            await self.db.execute("INSERT OR REPLACE INTO isin_map (isin, symbol) VALUES (?, ?)", (isin, symbol))
+        return symbol
+
+    async def validate(self, query):
+        try:
+            return await self._validate(query)
+        except LookupFailed:
+            return None  # Yahoo unreachable: not valid for now, but nothing is cached
+
+    async def _validate(self, query):
+        query = query.strip().upper()
+        if not query:
+            return None
+
+        hit, symbol = await self._cached(query)
+        if hit:
+            return symbol
+        symbol, verdicts = await self._resolve(query)
+        await self._remember(verdicts)
+        return symbol
+
+    async def validate_many(self, queries):
+        # One cache read for the whole batch; only the misses reach the network, all at once.
+        # Returns {normalized query: symbol or None}.
+        queries = list(dict.fromkeys(q.strip().upper() for q in queries if q.strip()))
+        results = {}
+        now = time.time()
+        for i in range(0, len(queries), 500):
+            chunk = queries[i:i + 500]
+            rows = await self.db.fetchall(
+                f"SELECT query, symbol, checked_at FROM ticker_validation WHERE query IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            for query, symbol, checked_at in rows:
+                if now - checked_at <= (POSITIVE_TTL if symbol else NEGATIVE_TTL):
+                    results[query] = symbol
+
+        misses = [query for query in queries if query not in results]
+        resolved = await asyncio.gather(*(self._resolve(query) for query in misses), return_exceptions=True)
+        verdicts = []
+        for query, outcome in zip(misses, resolved):
+            if isinstance(outcome, LookupFailed):
+                results[query] = None
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results[query], found = outcome
+                verdicts.extend(found)
+        if verdicts:
+            await self._remember(verdicts)
+        return results
+
+    async def _resolve(self, query):
+        # Returns the symbol and the (query, symbol) verdicts to cache; the caller writes them
+        if looks_like_isin(query):
+            resolved = await self.resolve_isin(query)
+            symbol, verdicts = None, []
+            if resolved:
+                hit, symbol = await self._cached(resolved)
+                if not hit:
+                    symbol, verdicts = await self._resolve(resolved)
+            return symbol, verdicts + [(query, symbol)]
+
+        candidates = [query]
+        if "." not in query:
+            candidates += [query + suffix for suffix in self.FALLBACK_SUFFIXES]
+        found = await asyncio.gather(*(self._exists(candidate) for candidate in candidates), return_exceptions=True)
+
+        # First candidate wins, so a plain US listing beats its Xetra twin. A failed check
+        # ahead of the winner leaves the answer unknown, and unknowns are never cached.
+        symbol = None
+        for candidate, ok in zip(candidates, found):
+            if isinstance(ok, BaseException):
+                raise ok
+            if ok:
+                symbol = candidate
+                break
+        verdicts = [(query, symbol)]
+        if symbol and symbol != query:
+            verdicts.append((symbol, symbol))
+        return symbol, verdicts